@@ -1,17 +1,23 @@
 import os
 import glob
-import subprocess
-import threading
-import time
-import re
-from flask import Flask, jsonify, render_template, send_file, request
+import json
+from flask import Flask, Response, jsonify, render_template, send_file, request
 from flask_cors import CORS
-from datetime import datetime
+from boot_analytics import ALL, BootAnalytics
+from capture import CaptureManager, port_id
+from log_files import SORT_KEYS, LineIndex, LogDirectory
+from postcode_rules import RuleSet
+from postcode_store import CAPACITY
+from session_index import SessionIndex, session_path
 
 # Configuration
 LOGDIR = "/home/rpi/postcode_logs"
-PORT = "/dev/ttyAMA0"
+PORT = "/dev/ttyAMA0"  # used when a request names no port
 BAUDRATE = 115200
+PORT_FORMAT = "text"  # "binary" for adapters that send raw port-80 bytes, one per code
+ECHO_SERIAL = False  # print every serial line to stdout as well as the log
+POSTCODE_CAPACITY = CAPACITY  # postcodes kept in memory per port; older ones are overwritten
+PORT_PATTERNS = ["/dev/ttyAMA*", "/dev/ttyUSB*", "/dev/ttyACM*"]  # offered by /ports
 
 app = Flask(__name__)
 CORS(app)
@@ -19,148 +25,34 @@ CORS(app)
 # Ensure log directory exists
 os.makedirs(LOGDIR, exist_ok=True)
 
-# Shared variables
-postcodes = []
-lock = threading.Lock()
-stop_event = threading.Event()
-reading_done = threading.Event()
-reading_thread = None
-minicom_process = None
-current_logfile = None
-
-def clean_ansi_escape_codes(text):
-    """Remove ANSI escape codes from text"""
-    # Regex to remove ANSI escape sequences
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    return ansi_escape.sub('', text)
-
-def parse_postcode_from_line(line):
-    """Extract postcode from a cleaned line of text"""
-    # Clean the line first
-    clean_line = clean_ansi_escape_codes(line)
-    
-    # Try multiple patterns to extract postcodes
-    patterns = [
-        r'\b([0-9a-fA-F]{2})\b',  # Standard hex codes
-        r'([0-9a-fA-F]{2})',       # Any 2-character hex
-        r'0x([0-9a-fA-F]{2})',     # 0x prefixed
-        r'([0-9a-fA-F]{2})h',      # h suffixed
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, clean_line)
-        if matches:
-            return matches[0].lower()  # Return first match in lowercase
-    return None
-
-def run_minicom():
-    """Run minicom and capture output in real-time"""
-    global postcodes, minicom_process, current_logfile
-    
-    print("[INFO] Starting minicom...")
-    
-    # Create a unique log file name
-    timestamp = datetime.now().strftime("%d-%m-%y-%H-%M-%S")
-    current_logfile = os.path.join(LOGDIR, f"POSTCODE_LOG_{timestamp}.txt")
-    
-    try:
-        # Start minicom directly (not through bash script)
-        cmd = f"sudo minicom -b {BAUDRATE} -o -D {PORT}"
-        
-        minicom_process = subprocess.Popen(
-            cmd,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            bufsize=1,
-            universal_newlines=True,
-            preexec_fn=os.setsid
-        )
-        
-        print(f"[INFO] Minicom started with PID: {minicom_process.pid}")
-        print(f"[INFO] Log file: {current_logfile}")
-        
-        # Open log file for writing
-        with open(current_logfile, 'w') as log_file:
-            log_file.write(f"Postcode Log - Started at {timestamp}\n")
-            log_file.write(f"Port: {PORT}, Baudrate: {BAUDRATE}\n")
-            log_file.write("="*50 + "\n")
-            
-            start_time = time.time()
-            e3_count = 0
-            last_activity = time.time()
-            
-            # Read output line by line
-            for line in iter(minicom_process.stdout.readline, ''):
-                if stop_event.is_set():
-                    break
-                
-                line = line.strip()
-                if line:
-                    # Clean ANSI escape codes
-                    clean_line = clean_ansi_escape_codes(line)
-                    
-                    # Write to log file
-                    timestamp_str = datetime.now().strftime("%H:%M:%S")
-                    log_entry = f"[{timestamp_str}] {clean_line}\n"
-                    log_file.write(log_entry)
-                    log_file.flush()
-                    
-                    print(f"[MINICOM] {clean_line}")
-                    
-                    # Parse postcode from the cleaned line
-                    postcode = parse_postcode_from_line(clean_line)
-                    
-                    if postcode:
-                        with lock:
-                            postcodes.append({
-                                "code": postcode,
-                                "timestamp": timestamp_str,
-                                "raw": clean_line
-                            })
-                            
-                            # Check for termination condition
-                            if postcode == "e3":
-                                e3_count += 1
-                                print(f"[INFO] 'e3' received ({e3_count}/2)")
-                                if e3_count == 2:
-                                    print("[INFO] Second 'e3' received. Stopping.")
-                                    reading_done.set()
-                                    stop_event.set()
-                                    break
-                    
-                    # Update last activity time
-                    last_activity = time.time()
-                
-                # Check for timeout (60 seconds of inactivity)
-                if time.time() - last_activity > 60 and last_activity > start_time:
-                    print("[TIMEOUT] 60 seconds of inactivity. Stopping.")
-                    reading_done.set()
-                    stop_event.set()
-                    break
-            
-            # Write summary
-            with lock:
-                total_codes = len(postcodes)
-                log_file.write(f"\nSession ended at {datetime.now().strftime('%H:%M:%S')}\n")
-                log_file.write(f"Total postcodes captured: {total_codes}\n")
-                print(f"[INFO] Session ended. Total postcodes: {total_codes}")
-    
-    except Exception as e:
-        print(f"[ERROR] Error in minicom execution: {e}")
-        import traceback
-        traceback.print_exc()
-    finally:
-        # Ensure process is terminated
-        if minicom_process and minicom_process.poll() is None:
-            print("[INFO] Terminating minicom process...")
-            try:
-                os.killpg(os.getpgid(minicom_process.pid), 15)  # SIGTERM
-                minicom_process.wait(timeout=5)
-            except:
-                pass
-        
-        reading_done.set()
+# Cached log listing and per-file line offsets for paged reads
+log_directory = LogDirectory(LOGDIR)
+line_index = LineIndex()
+
+# Binary copies of past readings, indexed by postcode
+session_index = SessionIndex(LOGDIR)
+
+# Running dwell-time statistics, fed by the readers
+analytics = BootAnalytics()
+
+# One capture per serial port, all read by a single selector thread
+captures = CaptureManager(LOGDIR, session_index, analytics, POSTCODE_CAPACITY, echo=ECHO_SERIAL)
+
+def port_arg():
+    """Device path from ?port=, which takes a path or a session id ("ttyUSB0")"""
+    value = request.args.get('port') or PORT
+    if not value.startswith('/'):
+        value = os.path.join('/dev', value)
+    value = os.path.normpath(value)
+    if not value.startswith('/dev/'):
+        raise ValueError(f"Not a serial device: {value}")
+    return value
+
+def port_error(e):
+    return jsonify({"status": "error", "message": str(e)}), 400
+
+def no_capture(port):
+    return jsonify({"status": "error", "message": f"No capture on {port}"}), 404
 
 @app.route('/')
 def index():
@@ -168,120 +60,271 @@ def index():
 
 @app.route('/start')
 def start_reading():
-    """Start minicom reading"""
-    global reading_thread, postcodes, minicom_process
-    
-    print("[API] /start - Starting minicom reading...")
-    
-    # Stop any existing process
-    if minicom_process and minicom_process.poll() is None:
-        print("[INFO] Stopping existing minicom process...")
-        try:
-            os.killpg(os.getpgid(minicom_process.pid), 15)
-            minicom_process.wait(timeout=2)
-        except:
-            pass
-    
-    if reading_thread and reading_thread.is_alive():
-        print("[INFO] Waiting for previous thread to finish...")
-        stop_event.set()
-        reading_thread.join(timeout=2)
-    
-    # Reset state
-    with lock:
-        postcodes.clear()
-    
-    stop_event.clear()
-    reading_done.clear()
+    """Start serial reading on ?port= (default PORT).
+
+    ?baud= overrides BAUDRATE, ?format=binary reads raw port-80 bytes and
+    ?label= groups the timing analytics (e.g. a firmware build).
+    """
+    try:
+        port = port_arg()
+    except ValueError as e:
+        return port_error(e)
     
-    # Start new thread
-    reading_thread = threading.Thread(target=run_minicom)
-    reading_thread.daemon = True
-    reading_thread.start()
+    print(f"[API] /start - Starting serial reading on {port}...")
     
-    # Give it a moment to start
-    time.sleep(1)
+    baudrate = request.args.get('baud', BAUDRATE, type=int)
+    fmt = request.args.get('format', PORT_FORMAT)
+    label = request.args.get('label') or None
+    try:
+        capture = captures.start(port, baudrate, fmt, label)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"[ERROR] Cannot open {port}: {e}")
+        return jsonify({"status": "error", "message": f"Cannot open {port}: {e}"}), 500
     
     return jsonify({
         "status": "started", 
-        "message": "Minicom reading started"
+        "session": capture.id,
+        "message": "Serial reading started"
     })
 
 @app.route('/stop')
 def stop_reading():
-    """Stop minicom reading"""
-    global minicom_process
-    
-    print("[API] /stop - Stopping minicom...")
-    
-    stop_event.set()
+    """Stop serial reading on ?port="""
+    try:
+        port = port_arg()
+    except ValueError as e:
+        return port_error(e)
     
-    if minicom_process and minicom_process.poll() is None:
-        try:
-            os.killpg(os.getpgid(minicom_process.pid), 15)
-            minicom_process.wait(timeout=2)
-            print("[INFO] Minicom process stopped")
-        except:
-            pass
+    print(f"[API] /stop - Stopping serial reader on {port}...")
+    if captures.stop(port):
+        print("[INFO] Serial reader stopped")
     
     return jsonify({"status": "success", "message": "Reading stopped"})
 
 @app.route('/poll')
 def poll_data():
-    """Poll for live data updates"""
-    with lock:
-        data_copy = postcodes.copy()
+    """Poll for live data updates on ?port=.
+
+    With ?since=<seq> only entries newer than that sequence number are
+    returned; pass the returned "cursor" as the next "since". "reset" tells
+    the client its cursor is from before a server restart and the list was
+    sent in full. ?raw=1 adds each entry's serial line, read back from the
+    session log.
+    """
+    try:
+        port = port_arg()
+    except ValueError as e:
+        return port_error(e)
+    capture = captures.capture(port)
+    if capture is None:
+        return no_capture(port)
     
-    if reading_done.is_set():
-        return jsonify({
-            "status": "completed", 
-            "postcodes": data_copy,
-            "count": len(data_copy),
-            "message": "Reading completed"
-        })
-    else:
-        return jsonify({
-            "status": "running", 
-            "postcodes": data_copy,
-            "count": len(data_copy),
-            "message": "Reading in progress"
-        })
+    since = request.args.get('since', type=int)
+    want_raw = request.args.get('raw', 'false').lower() in ('1', 'true')
+    if want_raw and capture.log is not None:
+        capture.log.commit(wait=True)
+    reset = False
+    with capture.lock:
+        store = capture.store
+        if since is None or since > store.last_seq:
+            reset = since is not None
+            since = store.base
+        # Only the new tail is copied; it's formatted after the lock is
+        # released so the capture thread is never held up
+        snapshot = store.snapshot(since)
+        count = store.count()
+        cursor = store.last_seq
+        overflow = store.overflow
+    data_copy = snapshot.entries()
+    if want_raw:
+        raw = snapshot.raw_lines()
+        for item in data_copy:
+            item["raw"] = raw.get(item["seq"], "")
+    
+    completed = capture.done.is_set()
+    return jsonify({
+        "status": "completed" if completed else "running",
+        "session": capture.id,
+        "postcodes": data_copy,
+        "count": count,
+        "cursor": cursor,
+        "reset": reset,
+        "overflow": overflow,
+        "stop_reason": capture.stop_reason,
+        "outcome": capture.outcome,
+        "message": "Reading completed" if completed else "Reading in progress"
+    })
+
+STREAM_KEEPALIVE = 15  # seconds between SSE comments on a quiet stream
+
+def sse_event(event, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_events(capture, since):
+    """SSE for one client, fed straight from the port's postcode store.
+
+    Every client waits on the capture's condition and reads only the entries
+    past its own cursor, so one reader serves any number of clients.
+    """
+    cursor = since
+    run = None
+    done_sent = False
+    yield "retry: 2000\n\n"
+    while True:
+        with capture.lock:
+            store = capture.store
+            if run != capture.run_id:
+                if run is not None:
+                    cursor = store.base       # /start began a new reading
+                run = capture.run_id
+                done_sent = False
+                new_run = True
+            else:
+                new_run = False
+            if not new_run and store.last_seq <= cursor and (done_sent or not capture.done.is_set()):
+                capture.changed.wait(STREAM_KEEPALIVE)
+            if cursor > store.last_seq:
+                cursor = store.base           # cursor from before a server restart
+            snapshot = store.snapshot(cursor)
+            count = store.count()
+            done = capture.done.is_set()
+            current_run = capture.run_id
+        
+        if current_run != run:
+            continue
+        new = snapshot.entries()
+        if new_run:
+            yield sse_event("session", {"session": capture.id, "run": run, "count": count})
+        for item in new:
+            yield sse_event("postcode", dict(item, count=count), item["seq"])
+        if new:
+            cursor = new[-1]["seq"]
+        elif done and not done_sent:
+            done_sent = True
+            yield sse_event("done", {"count": count, "cursor": cursor,
+                                     "stop_reason": capture.stop_reason, "outcome": capture.outcome})
+        elif not new_run:
+            yield ": keepalive\n\n"
+
+@app.route('/stream')
+def stream():
+    """Server-Sent Events for ?port=: one "postcode" event per code as it is parsed.
+
+    Resumes after the Last-Event-ID header (sent by EventSource on
+    reconnect) or ?since=<seq>; "session" marks a /start, "done" the end
+    of a reading.
+    """
+    try:
+        port = port_arg()
+    except ValueError as e:
+        return port_error(e)
+    capture = captures.capture(port, create=True)
+    if capture is None:
+        return no_capture(port)
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', 0, type=int)
+    return Response(
+        stream_events(capture, since),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.route('/clear')
 def clear_data():
-    """Clear live data buffer"""
-    global postcodes
-    with lock:
-        postcodes.clear()
+    """Clear live data buffer of ?port="""
+    try:
+        port = port_arg()
+    except ValueError as e:
+        return port_error(e)
+    capture = captures.capture(port)
+    if capture is not None:
+        capture.clear()
     return jsonify({"status": "success", "message": "Live data cleared"})
 
+@app.route('/rules', methods=['GET', 'PUT'])
+def rules():
+    """Rules that end a reading (see postcode_rules.py).
+
+    PUT a JSON list to replace them; with ?port= they apply to that port
+    only. Changes take effect at the next /start. PUT [] on a port goes
+    back to the default rules; an empty default list never stops a reading
+    on its own.
+    """
+    try:
+        port = port_arg() if request.args.get('port') else None
+    except ValueError as e:
+        return port_error(e)
+    if request.method == 'PUT':
+        specs = request.get_json(silent=True)
+        try:
+            ruleset = RuleSet(specs) if specs or port is None else None
+        except (TypeError, ValueError) as e:
+            return jsonify({"status": "error", "message": f"Invalid rules: {e}"}), 400
+        if not captures.set_rules(port, ruleset):
+            return no_capture(port)
+    ruleset = captures.rules_for(port) if port else captures.rules
+    return jsonify({"status": "success", "port": port, "rules": ruleset.specs()})
+
+@app.route('/ports')
+def list_ports():
+    """Serial devices present and the capture sessions on them"""
+    present = sorted({path for pattern in PORT_PATTERNS for path in glob.glob(pattern)})
+    active = {capture.port: capture.status() for capture in captures.captures()}
+    return jsonify({
+        "status": "success",
+        "default": PORT,
+        "ports": [{"port": path, "id": port_id(path), "session": active.get(path)}
+                  for path in sorted(set(present) | set(active))]
+    })
+
+def port_filter():
+    """Name fragment that marks logs and sessions of ?port=, or None for all"""
+    if not request.args.get('port'):
+        return None
+    return f"_{port_id(port_arg())}_"
+
 @app.route('/list_logs')
 def list_logs():
-    """List all log files in the directory"""
+    """List log files, served from the directory cache.
+
+    ?sort=modified|name|size (default modified), ?order=desc|asc and
+    ?offset / ?limit page through the list; "total" is the full count.
+    ?port= keeps only that port's logs.
+    """
     try:
-        log_files = []
+        sort = request.args.get('sort', 'modified')
+        if sort not in SORT_KEYS:
+            return jsonify({"status": "error", "message": f"Unknown sort '{sort}'"}), 400
+        reverse = request.args.get('order', 'desc').lower() != 'asc'
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = request.args.get('limit', type=int)
         
-        # Get all .txt files
-        for file_path in glob.glob(os.path.join(LOGDIR, "*.txt")):
-            file_stat = os.stat(file_path)
-            log_files.append({
-                "name": os.path.basename(file_path),
-                "path": file_path,
-                "size": file_stat.st_size,
-                "modified": datetime.fromtimestamp(file_stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
-                "created": datetime.fromtimestamp(file_stat.st_ctime).strftime("%Y-%m-%d %H:%M:%S")
-            })
+        live = [capture.logfile for capture in captures.captures() if capture.logfile]
+        log_files = log_directory.listing(sort, reverse, live=live)
+        tag = port_filter()
+        if tag:
+            log_files = [entry for entry in log_files if tag in entry["name"]]
+        end = len(log_files) if limit is None else offset + max(0, limit)
         
-        # Sort by modified time (newest first)
-        log_files.sort(key=lambda x: x["modified"], reverse=True)
-        
-        return jsonify({"status": "success", "logs": log_files})
+        return jsonify({
+            "status": "success",
+            "logs": log_files[offset:end],
+            "total": len(log_files),
+            "offset": offset
+        })
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
 @app.route('/get_log/<filename>')
 def get_log(filename):
-    """Get log file content"""
+    """Get log file content.
+
+    ?offset=<line>&limit=<lines> or ?tail=<lines> return just that range
+    (via a per-file line index); without them the whole file is returned.
+    "lines" is always the file's total line count.
+    """
     try:
         file_path = os.path.join(LOGDIR, filename)
         
@@ -299,15 +342,23 @@ def get_log(filename):
                 mimetype='text/plain'
             )
         else:
-            # Read and return content
-            with open(file_path, 'r') as f:
-                content = f.read()
+            capture = captures.find_log(file_path)
+            if capture is not None:
+                capture.log.commit(wait=True)   # include lines still being batched
+            
+            content, first_line, total = line_index.read(
+                file_path,
+                start=request.args.get('offset', 0, type=int),
+                limit=request.args.get('limit', type=int),
+                tail=request.args.get('tail', type=int)
+            )
             
             return jsonify({
                 "status": "success",
                 "filename": filename,
                 "content": content,
-                "lines": len(content.split('\n')),
+                "offset": first_line,
+                "lines": total,
                 "size": os.path.getsize(file_path)
             })
     
@@ -324,22 +375,107 @@ def delete_log(filename):
             return jsonify({"status": "error", "message": "File not found"}), 404
         
         os.remove(file_path)
+        
+        # Drop the binary copy of the session along with its text log
+        pcs_path = session_path(file_path)
+        if os.path.exists(pcs_path):
+            os.remove(pcs_path)
+        session_index.remove(os.path.splitext(filename)[0])
         return jsonify({"status": "success", "message": f"Deleted {filename}"})
     
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/analytics')
+def boot_analytics():
+    """Dwell time per postcode and per transition (count, mean, p95, max, last).
+
+    ?label= selects a /start label, or "port:<id>" for one port.
+    """
+    label = request.args.get('label', ALL)
+    min_count = request.args.get('min_count', 1, type=int)
+    summary = analytics.summary(label, min_count)
+    if summary is None:
+        return jsonify({"status": "error", "message": f"No data for label '{label}'",
+                        "labels": analytics.labels()}), 404
+    return jsonify(dict(summary, status="success", label=label, labels=analytics.labels()))
+
+@app.route('/analytics/reset')
+def reset_analytics():
+    """Forget all timing statistics"""
+    analytics.reset()
+    return jsonify({"status": "success", "message": "Analytics reset"})
+
+def session_results(sessions):
+    """Limit session query results to ?port= when given"""
+    try:
+        tag = port_filter()
+    except ValueError as e:
+        return port_error(e)
+    if tag:
+        sessions = [s for s in sessions if tag in s["session"] + "_"]
+    return jsonify({"status": "success", "sessions": sessions})
+
+def code_arg(value):
+    """Postcode query argument ("b4", "B4", "0xB4") as a byte, or None"""
+    try:
+        code = int(value, 16)
+    except (TypeError, ValueError):
+        return None
+    return code if 0 <= code <= 0xFF else None
+
+@app.route('/sessions')
+def list_sessions():
+    """Every saved reading with its code count, last code and duration"""
+    return session_results(session_index.sessions())
+
+@app.route('/sessions/with_code/<code>')
+def sessions_with_code(code):
+    """Sessions in which a postcode appeared"""
+    value = code_arg(code)
+    if value is None:
+        return jsonify({"status": "error", "message": f"Invalid postcode '{code}'"}), 400
+    return session_results(session_index.with_code(value))
+
+@app.route('/sessions/last_code/<code>')
+def sessions_last_code(code):
+    """Sessions that ended on a postcode, e.g. boots that stalled there"""
+    value = code_arg(code)
+    if value is None:
+        return jsonify({"status": "error", "message": f"Invalid postcode '{code}'"}), 400
+    return session_results(session_index.last_code(value))
+
+@app.route('/sessions/sequence')
+def sessions_sequence():
+    """Sessions where ?to= followed ?from= more than ?min_ms= later"""
+    first = code_arg(request.args.get('from'))
+    then = code_arg(request.args.get('to'))
+    if first is None or then is None:
+        return jsonify({"status": "error", "message": "from and to must be postcodes"}), 400
+    min_ms = request.args.get('min_ms', 0, type=int)
+    return session_results(session_index.sequence(first, then, min_ms))
+
 @app.route('/status')
 def status():
-    """Check server status"""
+    """Check server status; ?port= for one capture, otherwise all of them"""
+    try:
+        port = port_arg()
+    except ValueError as e:
+        return port_error(e)
+    capture = captures.capture(port)
+    sessions = {c.id: c.status() for c in captures.captures()}
+    current = sessions.get(port_id(port)) if capture is not None else None
     return jsonify({
         "status": "running",
-        "port": PORT,
-        "baudrate": BAUDRATE,
+        "port": port,
+        "baudrate": current["baudrate"] if current and current["baudrate"] else BAUDRATE,
         "log_dir": LOGDIR,
         "log_dir_exists": os.path.exists(LOGDIR),
-        "postcodes_in_memory": len(postcodes),
-        "minicom_running": minicom_process is not None and minicom_process.poll() is None
+        "postcodes_in_memory": current["postcodes_in_memory"] if current else 0,
+        "postcode_capacity": POSTCODE_CAPACITY,
+        "postcodes_overflow": current["postcodes_overflow"] if current else 0,
+        "reader_running": bool(current and current["running"]),
+        "sessions": sessions
     })
 
 if __name__ == "__main__":
@@ -351,11 +487,16 @@ if __name__ == "__main__":
     print("="*60)
     print("\nAvailable endpoints:")
     print("  /              - Web interface")
-    print("  /start         - Start reading")
+    print("  /start         - Start reading (?port=, ?baud=, ?label=)")
     print("  /stop          - Stop reading")
-    print("  /poll          - Get current postcodes")
+    print("  /poll          - Get current postcodes (?since=<seq> for new ones)")
+    print("  /stream        - Live postcodes as Server-Sent Events")
     print("  /clear         - Clear memory")
     print("  /list_logs     - List saved log files")
+    print("  /sessions      - Query past readings by postcode")
+    print("  /analytics     - Time spent per postcode and transition")
+    print("  /rules         - Rules that end a reading (PUT to change)")
+    print("  /ports         - Serial ports and their capture sessions")
     print("  /status        - Server status")
     print("="*60)
     print("\nStarting Flask server on 0.0.0.0:5010")
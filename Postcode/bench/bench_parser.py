@@ -0,0 +1,122 @@
+"""Lines per second for the postcode parser, checked against the old cascade.
+
+The corpus is raw serial text, one line per line: bench/corpus/boot_capture.txt
+by default, or any files given on the command line. POSTCODE_LOG_*.txt files
+from the log directory work too; their header and "[HH:MM:SS] " prefixes
+are skipped. The corpus is also mutated at random (hex runs, punctuation,
+non-ASCII word characters) to compare the two parsers on odd input.
+
+    python bench/bench_parser.py [capture.txt ...] [--rounds N]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from postcode_parser import clean_ansi, parse_line  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(HERE, "corpus", "boot_capture.txt")
+LOG_PREFIX = re.compile(r"^\[\d\d:\d\d:\d\d\] ")
+
+
+# ---- the parser as it was before postcode_parser.py, kept as the reference ----
+
+def legacy_clean_ansi_escape_codes(text):
+    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+    return ansi_escape.sub('', text)
+
+
+def legacy_parse_postcode_from_line(line):
+    clean_line = legacy_clean_ansi_escape_codes(line)
+    patterns = [
+        r'\b([0-9a-fA-F]{2})\b',
+        r'([0-9a-fA-F]{2})',
+        r'0x([0-9a-fA-F]{2})',
+        r'([0-9a-fA-F]{2})h',
+    ]
+    for pattern in patterns:
+        matches = re.findall(pattern, clean_line)
+        if matches:
+            return matches[0].lower()
+    return None
+
+
+# ---- corpus ----
+
+def load_corpus(paths):
+    lines = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = LOG_PREFIX.sub("", line.rstrip("\n"))
+                if line.startswith(("Postcode Log - ", "Port: ", "=====")):
+                    continue
+                lines.append(line)
+    return lines
+
+
+def mutate(lines, count, seed=16):
+    rng = random.Random(seed)
+    alphabet = "0123456789abcdefABCDEFxXhH _-.:;[]()=\u00e9\u00df\u0416\u00b0\x1b"
+    out = []
+    for _ in range(count):
+        base = rng.choice(lines)
+        junk = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        pos = rng.randint(0, len(base))
+        out.append(base[:pos] + junk + base[pos:])
+    return out
+
+
+# ---- benchmark ----
+
+def lines_per_second(parse, lines, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for line in lines:
+            parse(line)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def old_path(line):
+    # run_minicom cleaned each line, then the parser cleaned it again
+    return legacy_parse_postcode_from_line(legacy_clean_ansi_escape_codes(line))
+
+
+def new_path(line):
+    return parse_line(clean_ansi(line))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("captures", nargs="*", default=[DEFAULT_CORPUS])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    lines = load_corpus(args.captures)
+    checked = lines + mutate(lines, 20000)
+    mismatches = [(line, legacy_parse_postcode_from_line(line), parse_line(line)) for line in checked
+                  if legacy_parse_postcode_from_line(line) != parse_line(line)]
+    found = sum(1 for line in lines if parse_line(line))
+    print(f"{len(lines)} corpus lines ({found} with a postcode), {len(checked)} compared with the old parser")
+    if mismatches:
+        for line, old, new in mismatches[:10]:
+            print(f"  MISMATCH {line!r}: old={old!r} new={new!r}")
+        print(f"{len(mismatches)} mismatch(es)")
+        sys.exit(1)
+    print("results identical")
+
+    old = lines_per_second(old_path, lines, args.rounds)
+    new = lines_per_second(new_path, lines, args.rounds)
+    print(f"old cascade   : {old:12,.0f} lines/s")
+    print(f"compiled once : {new:12,.0f} lines/s  ({new / old:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import math
+import threading
+
+# -----------------------------
+# Online boot-phase timing
+# -----------------------------
+# The dwell time of a postcode is how long the DUT stayed on it: from its
+# arrival (monotonic clock) to the arrival of the next code. Every dwell is
+# added to running statistics for the code and for the transition
+# code -> next code as soon as the next code arrives, so nothing is ever
+# re-read from logs. Statistics are grouped by a label (e.g. the firmware
+# build under test) as well as under "all", so builds can be compared.
+#
+# p95 comes from a sparse log-scale histogram (8 buckets per power of two,
+# under 10% error) instead of keeping every sample.
+
+ALL = "all"
+BUCKETS_PER_OCTAVE = 8
+
+
+def _bucket(ms):
+    if ms <= 0.01:
+        return 0
+    return max(0, int(math.log2(ms * 100) * BUCKETS_PER_OCTAVE))
+
+
+def _bucket_upper(index):
+    return 2 ** ((index + 1) / BUCKETS_PER_OCTAVE) / 100
+
+
+class DwellStats:
+    __slots__ = ("count", "total", "max", "last", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.buckets = {}
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        self.last = ms
+        if ms > self.max:
+            self.max = ms
+        b = _bucket(ms)
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+
+    def percentile(self, q):
+        rank = math.ceil(self.count * q)
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                return min(_bucket_upper(b), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "max_ms": round(self.max, 3),
+            "last_ms": round(self.last, 3),
+        }
+
+
+class Group:
+    def __init__(self):
+        self.codes = {}               # code -> DwellStats
+        self.transitions = {}         # (code, next code) -> DwellStats
+        self.sessions = 0
+
+    def add(self, code, nxt, ms):
+        stats = self.codes.get(code)
+        if stats is None:
+            stats = self.codes[code] = DwellStats()
+        stats.add(ms)
+        stats = self.transitions.get((code, nxt))
+        if stats is None:
+            stats = self.transitions[(code, nxt)] = DwellStats()
+        stats.add(ms)
+
+    def summary(self, min_count=1):
+        return {
+            "sessions": self.sessions,
+            "codes": {code: s.summary() for code, s in sorted(self.codes.items()) if s.count >= min_count},
+            "transitions": {f"{a}>{b}": s.summary() for (a, b), s in sorted(self.transitions.items())
+                            if s.count >= min_count},
+        }
+
+
+class SessionTimer:
+    """Dwell tracking for one reading; feeds the groups it was started with"""
+
+    def __init__(self, analytics, groups):
+        self._analytics = analytics
+        self._groups = groups
+        self._prev = None             # (code, monotonic time) of the previous code
+
+    def observe(self, code, t):
+        """Record the arrival of `code` at monotonic time `t` (seconds).
+
+        The last code of a reading never gets a successor, so its dwell
+        time is unknown and not recorded.
+        """
+        if self._prev is not None:
+            prev, prev_t = self._prev
+            self._analytics.add(self._groups, prev, code, (t - prev_t) * 1000)
+        self._prev = (code, t)
+
+
+class BootAnalytics:
+    """Running dwell statistics, fed one code at a time by the readers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = {ALL: Group()}
+
+    def begin_session(self, *labels):
+        """SessionTimer recording under "all" and each non-empty label"""
+        groups = [ALL] + [label for label in labels if label and label != ALL]
+        with self._lock:
+            for name in groups:
+                self._groups.setdefault(name, Group()).sessions += 1
+        return SessionTimer(self, groups)
+
+    def add(self, groups, code, nxt, ms):
+        with self._lock:
+            for name in groups:
+                self._groups.setdefault(name, Group()).add(code, nxt, ms)
+
+    def labels(self):
+        with self._lock:
+            return sorted(self._groups)
+
+    def summary(self, label=ALL, min_count=1):
+        with self._lock:
+            group = self._groups.get(label)
+            return None if group is None else group.summary(min_count)
+
+    def reset(self):
+        with self._lock:
+            self._groups = {ALL: Group()}
@@ -0,0 +1,423 @@
+import os
+import queue
+import selectors
+import stat
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from log_writer import GroupCommitLog
+from postcode_parser import clean_ansi, codes_from_bytes, parse_line
+from postcode_rules import RuleRun, RuleSet, TimerWheel
+from postcode_store import CAPACITY, PostcodeStore
+from serial_reader import SerialLineReader, open_serial
+from session_index import session_path, write_session
+
+# -----------------------------
+# Multi-port postcode capture
+# -----------------------------
+# One PortCapture per UART holds what used to be module globals in app.py:
+# the live postcode store, the session log, the reading state and the
+# condition /poll and /stream clients wait on. All ports are read by a
+# single selector thread: a readable port is drained and parsed, each code
+# is fed to the capture's rules (postcode_rules.py), and every TICK the
+# shared timer wheel fires the rule deadlines that are due. Start
+# and stop requests are handed to that thread through a command queue and
+# a wake-up pipe, so a capture is only ever touched by one reader.
+#
+# Closing a finished session's log (fsync) and saving its binary copy run
+# on a short-lived thread so one slow SD card write never stalls the
+# other ports.
+
+TICK = 0.2                  # timer wheel resolution, seconds
+
+
+def port_id(port):
+    """Session id of a port: its device name, e.g. "ttyUSB0" """
+    return os.path.basename(port)
+
+
+class PortCapture:
+    """Postcode capture state for one serial port"""
+
+    def __init__(self, port, capacity=CAPACITY):
+        self.port = port
+        self.id = port_id(port)
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)   # wakes /stream clients
+        self.capacity = capacity
+        # Guarded by lock; a 1-slot placeholder until the first begin(), so
+        # a port that is only watched or configured costs next to nothing
+        self.store = PostcodeStore(1)
+        self.run_id = 0           # bumped per start so stream clients can tell readings apart
+        self.done = threading.Event()
+        self.running = False
+        self.baudrate = None
+        self.format = "text"
+        self.label = None
+        self.logfile = None
+        self.log = None           # GroupCommitLog of the current reading
+        self.reader = None
+        self.rules = None         # RuleSet for this port; None uses the manager's
+        self.stop_reason = None
+        self.outcome = None       # outcome of the rule that ended the reading
+        self._rules = None        # RuleRun of the current reading
+        self._timer = None
+        self._codes = None        # columnar copy for the .pcs session file
+        self._deltas = None
+        self._start = 0.0
+        self._start_wall = 0.0
+        self._last_ms = 0
+
+    # ---- request threads ----
+
+    def status(self):
+        with self.lock:
+            return {
+                "id": self.id,
+                "port": self.port,
+                "baudrate": self.baudrate,
+                "format": self.format,
+                "label": self.label,
+                "running": self.running,
+                "completed": self.done.is_set(),
+                "logfile": os.path.basename(self.logfile) if self.logfile else None,
+                "postcodes_in_memory": self.store.count(),
+                "postcode_capacity": self.capacity,
+                "postcodes_overflow": self.store.overflow,
+                "bytes_read": self.reader.bytes_read if self.reader else 0,
+                "stop_reason": self.stop_reason,
+                "outcome": self.outcome,
+                "rules_matched": list(self._rules.matched) if self._rules else [],
+            }
+
+    def clear(self):
+        with self.lock:
+            self.store.clear()
+            self.changed.notify_all()
+
+    # ---- setup, before the port is handed to the selector thread ----
+
+    def begin(self, fd, baudrate, fmt, label, logdir, analytics):
+        timestamp = datetime.now().strftime("%d-%m-%y-%H-%M-%S")
+        self.logfile = os.path.join(logdir, f"POSTCODE_LOG_{self.id}_{timestamp}.txt")
+        self.log = GroupCommitLog(self.logfile)
+        self.log.write(f"Postcode Log - Started at {timestamp}\n")
+        self.log.write(f"Port: {self.port}, Baudrate: {baudrate}\n")
+        if label:
+            self.log.write(f"Label: {label}\n")
+        self.log.write("=" * 50 + "\n")
+
+        self.reader = SerialLineReader(fd)
+        self._timer = analytics.begin_session(label, f"port:{self.id}")
+        self._codes = bytearray()
+        self._deltas = array('I')
+        self._start = time.monotonic()
+        self._start_wall = time.time()
+        self._last_ms = 0
+        self._rules = None
+        with self.lock:
+            self.baudrate = baudrate
+            self.format = fmt
+            self.label = label
+            self.stop_reason = None
+            self.outcome = None
+            if self.store.capacity != self.capacity:
+                self.store = PostcodeStore(self.capacity)
+            self.store.new_session(self.logfile)
+            self.run_id += 1
+            self.running = True
+            self.done.clear()
+            self.changed.notify_all()
+        print(f"[INFO] {self.id}: reading {self.port} at {baudrate} baud, log {self.logfile}")
+
+    # ---- selector thread ----
+
+    def arm(self, ruleset, wheel):
+        self._rules = RuleRun(ruleset, wheel, self, self._start)
+
+    def on_readable(self, echo=False):
+        """Drain and process the port; returns a stop reason or None"""
+        if self.format == "binary":
+            data = self.reader.drain_bytes()
+            if data is None:
+                return "serial port closed"
+            entries = [(code, code) for code in codes_from_bytes(data)]
+        else:
+            lines = self.reader.drain_lines()
+            if lines is None:
+                return "serial port closed"
+            entries = []
+            for raw in lines:
+                line = raw.decode("utf-8", "replace").strip()
+                if line:
+                    # Clean ANSI escape codes, then parse the postcode
+                    clean_line = clean_ansi(line)
+                    entries.append((clean_line, parse_line(clean_line)))
+
+        for clean_line, postcode in entries:
+            now = time.monotonic()
+            self._rules.line(now)
+            timestamp_str = datetime.now().strftime("%H:%M:%S")
+            offset = self.log.write(f"[{timestamp_str}] {clean_line}\n")
+            if echo:
+                print(f"[SERIAL {self.id}] {clean_line}")
+            if postcode:
+                reason = self._postcode(postcode, offset, now)
+                if reason:
+                    return reason
+        return None
+
+    def _postcode(self, postcode, offset, now):
+        ms = int((now - self._start) * 1000)
+        code = int(postcode, 16)
+        self._codes.append(code)
+        self._deltas.append(min(ms - self._last_ms, 0xFFFFFFFF))
+        self._last_ms = ms
+        self._timer.observe(postcode, now)
+        with self.lock:
+            self.store.append(postcode, now, offset)
+            self.changed.notify_all()
+
+        matched = len(self._rules.matched)
+        rule = self._rules.code(code, now)
+        if code in self._rules.ruleset.codes and len(self._rules.matched) == matched:
+            self.log.commit()         # progress towards a rule is on disk before its outcome
+        return self._ruled(rule, matched)
+
+    def on_timer(self, run, rule, now):
+        """A rule deadline of `run` passed; returns a stop reason or None"""
+        if run is not self._rules:
+            return None               # from an earlier reading
+        matched = len(run.matched)
+        return self._ruled(run.expire(rule, now), matched)
+
+    def _ruled(self, rule, matched):
+        for hit in self._rules.matched[matched:]:
+            self.log.write(f"[RULE] {hit['rule']}: {hit['outcome']} at {hit['t_ms']} ms\n")
+            print(f"[INFO] {self.id}: rule '{hit['rule']}' matched ({hit['outcome']})")
+        if len(self._rules.matched) > matched:
+            self.log.commit()
+        if rule is None:
+            return None
+        self.outcome = rule.outcome
+        return rule.reason()
+
+    def finish(self, reason, index):
+        """End the reading; the log is closed and saved in the background"""
+        print(f"[INFO] {self.id}: {reason}. Stopping.")
+        self.reader.close()
+        if self._rules is not None:
+            self._rules.cancel()
+        with self.lock:
+            self.stop_reason = reason
+            total = self.store.total()
+            self.running = False
+        self.log.write(f"\nSession ended at {datetime.now().strftime('%H:%M:%S')}\n")
+        self.log.write(f"Total postcodes captured: {total}\n")
+        self.log.write(f"Stopped: {reason}\n")
+        print(f"[INFO] {self.id}: session ended. Total postcodes: {total}")
+        threading.Thread(
+            target=_finalize,
+            args=(self.log, self.logfile, self._start_wall, self._codes, self._deltas, index),
+            name=f"finalize-{self.id}",
+            daemon=True,
+        ).start()
+        with self.lock:
+            self.done.set()
+            self.changed.notify_all()
+
+
+def _finalize(log, logfile, start, codes, deltas, index):
+    log.close()
+    path = session_path(logfile)
+    try:
+        write_session(path, start, codes, deltas)
+    except OSError as e:
+        print(f"[ERROR] Could not save session file {path}: {e}")
+        return
+    index.add(path)
+
+
+def _is_char_device(path):
+    try:
+        return stat.S_ISCHR(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+class CaptureManager:
+    """Every PortCapture, read by one selector thread"""
+
+    def __init__(self, logdir, session_index, analytics, capacity=CAPACITY, echo=False):
+        self.logdir = logdir
+        self.session_index = session_index
+        self.analytics = analytics
+        self.capacity = capacity
+        self.echo = echo
+        self.rules = RuleSet()    # default for ports without their own
+        self._wheel = TimerWheel(TICK, now=time.monotonic())   # selector thread only
+        self._captures = {}       # port -> PortCapture
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._commands = queue.SimpleQueue()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread = None
+
+    # ---- request threads ----
+
+    def capture(self, port, create=False):
+        """PortCapture of `port`; with `create`, made for existing character devices only"""
+        if create and not _is_char_device(port):
+            create = False
+        with self._lock:
+            capture = self._captures.get(port)
+            if capture is None and create:
+                capture = self._captures[port] = PortCapture(port, self.capacity)
+            return capture
+
+    def captures(self):
+        with self._lock:
+            return list(self._captures.values())
+
+    def find_log(self, path):
+        """The capture currently writing `path`, if any"""
+        for capture in self.captures():
+            if capture.logfile == path and capture.log is not None:
+                return capture
+        return None
+
+    def rules_for(self, port):
+        capture = self.capture(port)
+        return capture.rules if capture is not None and capture.rules is not None else self.rules
+
+    def set_rules(self, port, ruleset):
+        """Rules for readings started from now on; port None sets the default"""
+        if port is None:
+            self.rules = ruleset
+            return True
+        capture = self.capture(port, create=True)
+        if capture is None:
+            return False
+        capture.rules = ruleset
+        return True
+
+    def start(self, port, baudrate, fmt="text", label=None):
+        """(Re)start reading `port`; raises OSError/ValueError if it can't be opened,
+        RuntimeError if the selector thread could not take it on
+        """
+        existed = self.capture(port) is not None
+        capture = self.capture(port, create=True)
+        if capture is None:
+            raise FileNotFoundError(f"No such serial device: {port}")
+        self.stop(port)
+        # Open the port here so a missing device or permission problem is reported
+        try:
+            fd = open_serial(port, baudrate)
+        except (OSError, ValueError):
+            if not existed:
+                with self._lock:
+                    if self._captures.get(port) is capture:
+                        del self._captures[port]   # never read; don't list it
+            raise
+        capture.begin(fd, baudrate, fmt, label, self.logdir, self.analytics)
+        ruleset = capture.rules or self.rules
+        try:
+            self._call(lambda: self._attach(capture, fd, ruleset))
+        except Exception as e:
+            raise RuntimeError(f"Could not start reading {port}: {e}") from e
+        return capture
+
+    def stop(self, port):
+        """Stop reading `port`; False if it wasn't running"""
+        capture = self.capture(port)
+        if capture is None or not capture.running:
+            return False
+        self._call(lambda: self._finish(capture, "stopped by request"))
+        return True
+
+    def _call(self, fn, timeout=5):
+        """Run `fn` on the selector thread and wait for it; re-raises what it raised"""
+        self._ensure_thread()
+        done = threading.Event()
+        errors = []
+        self._commands.put((fn, done, errors))
+        try:
+            os.write(self._wake_w, b"x")
+        except BlockingIOError:
+            pass  # a wake-up is already pending
+        done.wait(timeout)
+        if errors:
+            raise errors[0]
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="postcode-capture", daemon=True)
+                self._thread.start()
+
+    # ---- selector thread ----
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select(TICK):
+                if key.data is None:
+                    self._run_commands()
+                    continue
+                capture = key.data
+                if not capture.running:
+                    continue
+                try:
+                    reason = capture.on_readable(self.echo)
+                except Exception as e:
+                    print(f"[ERROR] {capture.id}: error in serial reader: {e}")
+                    reason = "reader error"
+                if reason:
+                    self._finish(capture, reason)
+            now = time.monotonic()
+            for capture, run, rule in self._wheel.advance(now):
+                if capture.running:
+                    reason = capture.on_timer(run, rule, now)
+                    if reason:
+                        self._finish(capture, reason)
+
+    def _attach(self, capture, fd, ruleset):
+        try:
+            capture.arm(ruleset, self._wheel)
+            self._selector.register(fd, selectors.EVENT_READ, capture)
+        except Exception as e:
+            # Never read: close the port and log now, not at the next /stop
+            self._finish(capture, f"could not start: {e}")
+            raise
+
+    def _run_commands(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        while True:
+            try:
+                fn, done, errors = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                fn()
+            except Exception as e:
+                print(f"[ERROR] Capture command failed: {e}")
+                errors.append(e)
+            finally:
+                done.set()
+
+    def _finish(self, capture, reason):
+        if not capture.running:
+            return
+        try:
+            self._selector.unregister(capture.reader.fd)
+        except (KeyError, ValueError):
+            pass
+        capture.finish(reason, self.session_index)
@@ -0,0 +1,140 @@
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+
+# -----------------------------
+# Log directory cache and line index
+# -----------------------------
+# LogDirectory keeps the stat() results of every log and only rescans when
+# the directory's mtime changes (a log was created, renamed or deleted);
+# the log currently being written is re-stat'ed on each call since appends
+# don't touch the directory. Sorted orders are cached the same way.
+#
+# LineIndex records the byte offset of every line start per log file, so a
+# page of lines is a single seek + read. Logs are append-only: when a file
+# has grown, only the new tail is scanned.
+
+SCAN_CHUNK = 1 << 20
+MAX_INDEXED_FILES = 32
+SORT_KEYS = {
+    "modified": lambda e: e["mtime"],
+    "name": lambda e: e["name"],
+    "size": lambda e: e["size"],
+}
+
+
+class _Lines:
+    __slots__ = ("ino", "size", "offsets")
+
+    def __init__(self, ino):
+        self.ino = ino
+        self.size = 0
+        self.offsets = array("Q", [0])    # line starts; the last may equal size
+
+
+class LineIndex:
+    def __init__(self, max_files=MAX_INDEXED_FILES):
+        self.max_files = max_files
+        self._files = OrderedDict()       # path -> _Lines
+        self._lock = threading.Lock()
+
+    def _index(self, path):
+        st = os.stat(path)
+        lines = self._files.get(path)
+        if lines is None or lines.ino != st.st_ino or st.st_size < lines.size:
+            lines = _Lines(st.st_ino)
+        if st.st_size > lines.size:
+            with open(path, "rb") as f:
+                f.seek(lines.size)
+                pos = lines.size
+                while pos < st.st_size:
+                    chunk = f.read(min(SCAN_CHUNK, st.st_size - pos))
+                    if not chunk:
+                        break
+                    i = chunk.find(b"\n")
+                    while i >= 0:
+                        lines.offsets.append(pos + i + 1)
+                        i = chunk.find(b"\n", i + 1)
+                    pos += len(chunk)
+                lines.size = pos
+        self._files[path] = lines
+        self._files.move_to_end(path)
+        while len(self._files) > self.max_files:
+            self._files.popitem(last=False)
+        return lines
+
+    def read(self, path, start=0, limit=None, tail=None):
+        """(text of the selected lines, first line number, total lines)"""
+        with self._lock:
+            lines = self._index(path)
+            offsets = lines.offsets
+            size = lines.size
+        total = len(offsets) - (1 if offsets[-1] == size else 0)
+        if tail is not None:
+            start = max(0, total - tail)
+            limit = tail
+        start = min(max(0, start), total)
+        end = total if limit is None else min(total, start + max(0, limit))
+        if start == end:
+            return "", start, total
+        first = offsets[start]
+        last = offsets[end] if end < len(offsets) else size
+        with open(path, "rb") as f:
+            f.seek(first)
+            data = f.read(last - first)
+        return data.decode("utf-8", "replace"), start, total
+
+
+class LogDirectory:
+    def __init__(self, directory, suffix=".txt"):
+        self.directory = directory
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._entries = {}                # name -> entry dict
+        self._sorted = {}                 # (sort, reverse) -> [entry]
+
+    def listing(self, sort="modified", reverse=True, live=()):
+        """All logs sorted by `sort`; paths in `live` are always re-stat'ed"""
+        key = SORT_KEYS[sort]
+        with self._lock:
+            self._refresh(live)
+            order = self._sorted.get((sort, reverse))
+            if order is None:
+                order = self._sorted[(sort, reverse)] = sorted(self._entries.values(), key=key, reverse=reverse)
+            return order
+
+    def _refresh(self, live):
+        mtime = os.stat(self.directory).st_mtime_ns
+        if mtime != self._mtime:
+            entries = {}
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.name.endswith(self.suffix) and item.is_file():
+                        entries[item.name] = _entry(item.path, item.stat())
+            self._entries = entries
+            self._sorted = {}
+            self._mtime = mtime
+        for path in live:
+            name = os.path.basename(path) if path else None
+            if name in self._entries:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if st.st_size != self._entries[name]["size"] or st.st_mtime != self._entries[name]["mtime"]:
+                    self._entries[name].update(_entry(path, st))
+                    self._sorted = {}
+
+
+def _entry(path, st):
+    return {
+        "name": os.path.basename(path),
+        "path": path,
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "modified": datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+        "created": datetime.fromtimestamp(st.st_ctime).strftime("%Y-%m-%d %H:%M:%S"),
+    }
@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+
+# -----------------------------
+# Group-commit log writer
+# -----------------------------
+# The reader thread only appends encoded lines to an in-memory batch; a
+# flusher thread writes the whole batch with one write() + flush() once it
+# reaches FLUSH_BYTES, once the oldest pending line is FLUSH_INTERVAL old
+# (the durability window), or when commit() asks for it (session end,
+# terminal postcodes). close() commits and fsyncs.
+
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL = 1.0
+
+
+class GroupCommitLog:
+    """Append-only text log written in batches by a background thread"""
+
+    def __init__(self, path, flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._file = open(path, "wb")
+        self._cond = threading.Condition()
+        self._pending = []
+        self._pending_bytes = 0
+        self._oldest = None           # monotonic time of the oldest pending line
+        self._commit_seq = 0          # commits requested
+        self._done_seq = 0            # commits completed
+        self._closed = False
+        self._finished = False        # final batch written and file closed
+        self.offset = 0               # bytes handed to write() so far
+        self.flushes = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, text):
+        """Queue `text`; returns its byte offset in the file. Never does I/O."""
+        data = text.encode("utf-8", "replace")
+        with self._cond:
+            offset = self.offset
+            self.offset += len(data)
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._cond.notify()
+            elif self._pending_bytes >= self.flush_bytes:
+                self._cond.notify()
+        return offset
+
+    def commit(self, wait=False, timeout=5):
+        """Write out everything queued so far; optionally wait until it is"""
+        with self._cond:
+            self._commit_seq += 1
+            target = self._commit_seq
+            self._cond.notify_all()
+            if wait:
+                self._cond.wait_for(lambda: self._done_seq >= target or self._finished, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=10)
+
+    def _due(self):
+        if self._closed or self._commit_seq > self._done_seq:
+            return True
+        if not self._pending:
+            return False
+        return (self._pending_bytes >= self.flush_bytes
+                or time.monotonic() - self._oldest >= self.flush_interval)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due():
+                    timeout = None
+                    if self._oldest is not None:
+                        timeout = max(0.0, self._oldest + self.flush_interval - time.monotonic())
+                    self._cond.wait(timeout)
+                batch = self._pending
+                self._pending = []
+                self._pending_bytes = 0
+                self._oldest = None
+                target = self._commit_seq
+                closing = self._closed
+            if batch:
+                self._write(b"".join(batch))
+            if closing:
+                self._finish()
+                return
+            with self._cond:
+                self._done_seq = target
+                self._cond.notify_all()
+
+    def _write(self, data):
+        try:
+            self._file.write(data)
+            self._file.flush()
+            self.flushes += 1
+        except OSError as e:
+            print(f"[ERROR] Log write failed for {self.path}: {e}")
+
+    def _finish(self):
+        try:
+            os.fsync(self._file.fileno())
+        except OSError:
+            pass
+        self._file.close()
+        with self._cond:
+            self._done_seq = self._commit_seq
+            self._finished = True
+            self._cond.notify_all()
@@ -0,0 +1,39 @@
+import re
+
+# -----------------------------
+# Postcode line parser
+# -----------------------------
+# Everything is compiled once at import. A line yields its first standalone
+# two-digit hex token ("B4", "POST 19 ok") or, failing that, the first pair
+# of adjacent hex digits anywhere in it ("0x19" -> "19", "code=0AEh" -> "0a").
+# That is exactly what the original four-pattern cascade returned: its
+# "0x" and "h" suffix patterns could never be reached, as the bare-pair
+# pattern before them matches every line they would.
+#
+# Both rules are folded into one anchored regex, so each line is a single
+# match() call. Adapters that send raw port-80 bytes instead of text are
+# handled by codes_from_bytes().
+
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+POSTCODE = re.compile(r'.*?\b([0-9a-fA-F]{2})\b|.*?([0-9a-fA-F]{2})', re.S)
+HEX_BYTE = ["%02x" % b for b in range(256)]
+
+
+def clean_ansi(text):
+    """Remove ANSI escape codes from text"""
+    if "\x1b" not in text:
+        return text
+    return ANSI_ESCAPE.sub('', text)
+
+
+def parse_line(line):
+    """Lower-case two-digit postcode from a text line, or None"""
+    m = POSTCODE.match(clean_ansi(line))
+    if m is None:
+        return None
+    return (m.group(1) or m.group(2)).lower()
+
+
+def codes_from_bytes(data):
+    """Postcodes from a raw binary port-80 stream, one byte per code"""
+    return [HEX_BYTE[b] for b in data]
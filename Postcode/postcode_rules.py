@@ -0,0 +1,287 @@
+import math
+from array import array
+
+# -----------------------------
+# Postcode rules: sequence automaton + timer wheel
+# -----------------------------
+# A rule set decides when a reading is over. Three kinds of rule:
+#
+#   {"name": "booted", "sequence": ["e3"], "count": 2, "outcome": "success"}
+#       the codes arrive back to back, `count` times (default once)
+#   {"name": "loop", "sequence": ["a0", "b4"], "repeat": 3, "outcome": "failure"}
+#       shorthand for the sequence written out `repeat` times
+#   {"name": "hang", "stuck": 20, "code": "b4", "outcome": "failure"}
+#       the DUT stays on one code (`code`, or any code) for that many seconds
+#   {"name": "silent", "silence": 60, "outcome": "timeout"}
+#       no serial line for that many seconds, counted from /start
+#
+# Rules with "stop": false only record the match. All sequences are
+# compiled into one Aho-Corasick automaton, flattened to a 256-wide
+# transition table, so each parsed code costs one array lookup however
+# many rules there are. Deadlines live in a timer wheel shared by all
+# ports and are re-armed lazily: a line or code change only updates a
+# timestamp, and an expiring timer re-schedules itself if that moved.
+#
+# The table costs 1 KiB per automaton state, so sequences are capped at
+# MAX_SEQUENCE_CODES codes across the whole rule set, repeat included.
+
+DEFAULT_RULES = [
+    {"name": "boot_complete", "sequence": ["e3"], "count": 2, "outcome": "success"},
+    {"name": "inactivity", "silence": 60, "outcome": "timeout"},
+]
+OUTCOMES = ("success", "failure", "timeout", "info")
+MAX_SEQUENCE_CODES = 4096       # all sequences together, after repeat
+MAX_COUNT = 10000
+MAX_SECONDS = 24 * 60 * 60      # longest stuck / silence deadline
+
+
+def _code(value):
+    """Postcode "e3" / "0xE3" / 227 -> 227"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        code = value
+    elif isinstance(value, str):
+        text = value.strip().lower()
+        if text.startswith("0x"):
+            text = text[2:]
+        if not 1 <= len(text) <= 2:
+            raise ValueError(f"Bad postcode {value!r}")
+        try:
+            code = int(text, 16)
+        except ValueError:
+            raise ValueError(f"Bad postcode {value!r}") from None
+    else:
+        raise ValueError(f"Bad postcode {value!r}")
+    if not 0 <= code <= 0xFF:
+        raise ValueError(f"Bad postcode {value!r}")
+    return code
+
+
+class Rule:
+    __slots__ = ("index", "name", "kind", "sequence", "count", "seconds", "code", "outcome", "stop", "spec")
+
+    def __init__(self, index, spec):
+        if not isinstance(spec, dict):
+            raise ValueError(f"Rule {index} is not an object")
+        self.index = index
+        self.spec = spec
+        self.name = str(spec.get("name") or f"rule{index}")
+        self.outcome = spec.get("outcome", "info")
+        if self.outcome not in OUTCOMES:
+            raise ValueError(f"Rule '{self.name}': outcome must be one of {', '.join(OUTCOMES)}")
+        self.stop = bool(spec.get("stop", True))
+        self.sequence = ()
+        self.count = 1
+        self.seconds = 0.0
+        self.code = None
+        kinds = [k for k in ("sequence", "stuck", "silence") if k in spec]
+        if len(kinds) != 1:
+            raise ValueError(f"Rule '{self.name}' needs exactly one of sequence, stuck, silence")
+        self.kind = kinds[0]
+        if self.kind == "sequence":
+            codes = spec["sequence"]
+            if not isinstance(codes, list) or not codes:
+                raise ValueError(f"Rule '{self.name}': sequence must be a non-empty list")
+            repeat = int(spec.get("repeat", 1))
+            self.count = int(spec.get("count", 1))
+            if repeat < 1 or self.count < 1:
+                raise ValueError(f"Rule '{self.name}': repeat and count must be at least 1")
+            if self.count > MAX_COUNT:
+                raise ValueError(f"Rule '{self.name}': count must be at most {MAX_COUNT}")
+            if len(codes) * repeat > MAX_SEQUENCE_CODES:
+                raise ValueError(f"Rule '{self.name}': sequence is longer than {MAX_SEQUENCE_CODES} codes")
+            self.sequence = tuple(_code(c) for c in codes) * repeat
+        else:
+            self.seconds = float(spec[self.kind])
+            # Checked this way round so NaN and Infinity fail too
+            if not (math.isfinite(self.seconds) and 0 < self.seconds <= MAX_SECONDS):
+                raise ValueError(f"Rule '{self.name}': {self.kind} must be between 0 and {MAX_SECONDS} seconds")
+            if self.kind == "stuck" and spec.get("code") is not None:
+                self.code = _code(spec["code"])
+
+    def reason(self):
+        return f"rule '{self.name}' matched ({self.outcome})"
+
+
+class RuleSet:
+    """Validated rules with their sequences compiled into one automaton"""
+
+    def __init__(self, specs=DEFAULT_RULES):
+        if not isinstance(specs, list):
+            raise ValueError("Rules must be a list")
+        self.rules = [Rule(i, spec) for i, spec in enumerate(specs)]
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Rule names must be unique")
+        self.timed = [rule for rule in self.rules if rule.kind != "sequence"]
+        sequences = [rule for rule in self.rules if rule.kind == "sequence"]
+        if sum(len(rule.sequence) for rule in sequences) > MAX_SEQUENCE_CODES:
+            raise ValueError(f"Rule sequences total more than {MAX_SEQUENCE_CODES} codes")
+        # Codes named by any rule; the capture commits its log on these
+        self.codes = frozenset(code for rule in sequences for code in rule.sequence) | frozenset(
+            rule.code for rule in self.timed if rule.code is not None)
+        self._compile(sequences)
+
+    def specs(self):
+        return [rule.spec for rule in self.rules]
+
+    def _compile(self, rules):
+        goto = [{}]
+        out = [[]]
+        for rule in rules:
+            state = 0
+            for code in rule.sequence:
+                nxt = goto[state].get(code)
+                if nxt is None:
+                    nxt = goto[state][code] = len(goto)
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(rule)
+
+        # Breadth-first: fill in fail links and flatten to a DFA table
+        delta = array("I", [0]) * (256 * len(goto))
+        fail = [0] * len(goto)
+        queue = []
+        for code, nxt in goto[0].items():
+            delta[code] = nxt
+            queue.append(nxt)
+        for state in queue:
+            out[state] = out[state] + out[fail[state]]
+            base = state * 256
+            fbase = fail[state] * 256
+            delta[base:base + 256] = delta[fbase:fbase + 256]
+            for code, nxt in goto[state].items():
+                fail[nxt] = delta[fbase + code]
+                delta[base + code] = nxt
+                queue.append(nxt)
+        self.delta = delta
+        self.outputs = [tuple(o) for o in out]
+
+
+class Timer:
+    __slots__ = ("deadline", "data", "cancelled")
+
+    def __init__(self, deadline, data):
+        self.deadline = deadline
+        self.data = data
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Hashed timer wheel; advance() returns the data of expired timers.
+
+    A timer fires with the slot its deadline falls in, which may be up to
+    one resolution early; owners re-check and re-schedule.
+    """
+
+    def __init__(self, resolution, slots=512, now=0.0):
+        self.resolution = resolution
+        self._slots = [[] for _ in range(slots)]
+        self._cursor = 0
+        self._time = now              # start of the current slot
+
+    def schedule(self, deadline, data):
+        timer = Timer(deadline, data)
+        ticks = max(1, math.ceil((deadline - self._time) / self.resolution))
+        # Timers further out than one turn wait in their slot for later turns
+        self._slots[(self._cursor + ticks) % len(self._slots)].append(timer)
+        return timer
+
+    def advance(self, now):
+        expired = []
+        steps = int((now - self._time) / self.resolution)
+        if steps <= 0:
+            return expired
+        horizon = self._time + (steps + 1) * self.resolution
+        for _ in range(min(steps, len(self._slots))):
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            slot = self._slots[self._cursor]
+            if slot:
+                keep = []
+                for timer in slot:
+                    if timer.cancelled:
+                        continue
+                    if timer.deadline < horizon:
+                        expired.append(timer.data)
+                    else:
+                        keep.append(timer)
+                self._slots[self._cursor] = keep
+        self._time += steps * self.resolution
+        return expired
+
+
+class RuleRun:
+    """Rule state for one reading"""
+
+    def __init__(self, ruleset, wheel, owner, now):
+        self.ruleset = ruleset
+        self._wheel = wheel
+        self._owner = owner
+        self._state = 0
+        self._hits = {}               # sequence rule -> matches so far
+        self._timers = {}             # rule -> Timer
+        self._last_line = now
+        self._code = None
+        self._code_since = now
+        self._spent = set()           # stuck rules already matched on this visit
+        self.matched = []             # [{"rule", "outcome", "t_ms"}]
+        self._start = now
+        for rule in ruleset.timed:
+            if rule.kind == "silence":
+                self._arm(rule, now + rule.seconds)
+
+    def line(self, now):
+        self._last_line = now
+
+    def code(self, code, now):
+        """Feed a parsed code; returns the first stopping rule it completes"""
+        rs = self.ruleset
+        self._state = state = rs.delta[self._state * 256 + code]
+        if code != self._code:
+            self._code = code
+            self._code_since = now
+            self._spent.clear()
+            for rule in rs.timed:
+                if rule.kind == "stuck" and rule not in self._timers and rule.code in (None, code):
+                    self._arm(rule, now + rule.seconds)
+        stop = None
+        for rule in rs.outputs[state]:
+            hits = self._hits[rule] = self._hits.get(rule, 0) + 1
+            if hits == rule.count and self._match(rule, now) and stop is None:
+                stop = rule
+        return stop
+
+    def expire(self, rule, now):
+        """A deadline passed; returns `rule` if it matched and stops the reading"""
+        self._timers.pop(rule, None)
+        if rule.kind == "silence":
+            deadline = self._last_line + rule.seconds
+        else:
+            if rule.code not in (None, self._code) or rule in self._spent:
+                return None           # re-armed by the next code change
+            deadline = self._code_since + rule.seconds
+        if deadline > now:
+            self._arm(rule, deadline)
+            return None
+        if rule.kind == "stuck":
+            self._spent.add(rule)     # counts once per visit to a code
+        return rule if self._match(rule, now) else None
+
+    def cancel(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+
+    def _arm(self, rule, deadline):
+        self._timers[rule] = self._wheel.schedule(deadline, (self._owner, self, rule))
+
+    def _match(self, rule, now):
+        self.matched.append({
+            "rule": rule.name,
+            "outcome": rule.outcome,
+            "t_ms": int((now - self._start) * 1000),
+        })
+        return rule.stop
@@ -0,0 +1,140 @@
+import time
+from array import array
+
+# -----------------------------
+# Bounded postcode store
+# -----------------------------
+# Ring buffer over parallel arrays: one byte for the code, a monotonic
+# timestamp and the byte offset of the line in the session's log file,
+# 17 bytes per postcode instead of a dict with a formatted time string and
+# the full raw line. Raw lines are read back from the log only when asked
+# for. Once `capacity` codes are held the oldest are overwritten and
+# counted in `overflow`.
+#
+# Every code gets a sequence number (seq) that only ever grows; code number
+# `seq` lives in slot (seq - 1) % capacity. Not thread-safe: callers hold
+# their own lock, and only for snapshot(), which copies the wanted range
+# of the arrays; building dicts and reading raw lines happen afterwards.
+
+CAPACITY = 100000
+
+
+class PostcodeStore:
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.codes = bytearray(capacity)
+        self.times = array("d", bytes(8 * capacity))
+        self.offsets = array("Q", bytes(8 * capacity))
+        self.last_seq = 0             # seq of the newest code
+        self.base = 0                 # codes up to this seq were cleared
+        self.overflow = 0             # codes overwritten since the last clear
+        self.log_path = None
+        self._anchor = (time.time(), time.monotonic())
+
+    # ---- writing ----
+
+    def new_session(self, log_path):
+        """Forget held codes and point raw-line lookups at a new log file"""
+        self.clear()
+        self.log_path = log_path
+        self._anchor = (time.time(), time.monotonic())
+
+    def clear(self):
+        self.base = self.last_seq
+        self.overflow = 0
+
+    def append(self, code, timestamp, offset):
+        """Store a two-digit hex code; returns its seq"""
+        self.last_seq += 1
+        slot = (self.last_seq - 1) % self.capacity
+        if self.last_seq - self.base > self.capacity:
+            self.overflow += 1
+        self.codes[slot] = int(code, 16)
+        self.times[slot] = timestamp
+        self.offsets[slot] = offset
+        return self.last_seq
+
+    # ---- reading ----
+
+    def first_seq(self):
+        """Oldest seq still held (last_seq + 1 when empty)"""
+        return max(self.base, self.last_seq - self.capacity) + 1
+
+    def count(self):
+        return self.last_seq - self.first_seq() + 1
+
+    def total(self):
+        """Codes since the last clear, including overwritten ones"""
+        return self.last_seq - self.base
+
+    def code(self, seq):
+        return "%02x" % self.codes[(seq - 1) % self.capacity]
+
+    def mono_time(self, seq):
+        return self.times[(seq - 1) % self.capacity]
+
+    def wall_time(self, seq):
+        wall, mono = self._anchor
+        return wall + self.mono_time(seq) - mono
+
+    def snapshot(self, seq):
+        """Copy of the entries newer than `seq`, to be formatted after the lock is released"""
+        start = max(seq + 1, self.first_seq())
+        count = max(0, self.last_seq - start + 1)
+        first = (start - 1) % self.capacity
+        end = first + count
+        if end <= self.capacity:
+            part = slice(first, end)
+            codes, times, offsets = self.codes[part], self.times[part], self.offsets[part]
+        else:
+            head, tail = slice(first, self.capacity), slice(0, end - self.capacity)
+            codes = self.codes[head] + self.codes[tail]
+            times = self.times[head] + self.times[tail]
+            offsets = self.offsets[head] + self.offsets[tail]
+        return Snapshot(start, codes, times, offsets, self._anchor, self.log_path)
+
+
+class Snapshot:
+    """Entries copied out of a PostcodeStore; needs no lock to read"""
+
+    def __init__(self, start, codes, times, offsets, anchor, log_path):
+        self.start = start            # seq of the first entry
+        self.codes = codes
+        self.times = times
+        self.offsets = offsets
+        self.anchor = anchor
+        self.log_path = log_path
+
+    def __len__(self):
+        return len(self.codes)
+
+    def entries(self):
+        wall, mono = self.anchor
+        out = []
+        second = None
+        for i, code in enumerate(self.codes):
+            t = self.times[i]
+            when = int(wall + t - mono)
+            if when != second:        # one strftime per second, not per code
+                second = when
+                stamp = time.strftime("%H:%M:%S", time.localtime(when))
+            out.append({
+                "seq": self.start + i,
+                "code": "%02x" % code,
+                "timestamp": stamp,
+                "t_ms": round((t - mono) * 1000, 3),
+            })
+        return out
+
+    def raw_lines(self):
+        """Raw serial lines by seq, read back from the log file"""
+        lines = {}
+        if not self.log_path or not self.codes:
+            return lines
+        with open(self.log_path, "rb") as f:
+            for i, offset in enumerate(self.offsets):
+                f.seek(offset)
+                line = f.readline().decode("utf-8", "replace").rstrip("\n")
+                # Log lines are "[HH:MM:SS] <raw>"
+                lines[self.start + i] = line.split("] ", 1)[1] if line.startswith("[") and "] " in line else line
+        return lines
@@ -0,0 +1,125 @@
+import errno
+import os
+import pty
+import termios
+
+# -----------------------------
+# Native serial port reader
+# -----------------------------
+# Opens the UART directly in raw mode (no minicom, no shell, no terminal
+# emulator in between) with non-blocking reads. The caller's selector says
+# when the port is readable; drain_*() then takes everything waiting and
+# splits it into lines here.
+#
+# Anything that behaves like a tty works as the port, so a pty from
+# pty_stand_in() can replace /dev/ttyAMA0 when no board is attached.
+
+READ_CHUNK = 4096
+MAX_LINE = 4096            # a line without newline is cut here
+
+
+def _baud_constant(baudrate):
+    try:
+        return getattr(termios, f"B{baudrate}")
+    except AttributeError:
+        raise ValueError(f"unsupported baudrate {baudrate}") from None
+
+
+def open_serial(path, baudrate=115200):
+    """Open `path` raw, 8N1, non-blocking; returns the file descriptor"""
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    try:
+        iflag, oflag, cflag, lflag, ispeed, ospeed, cc = termios.tcgetattr(fd)
+        iflag &= ~(termios.IGNBRK | termios.BRKINT | termios.PARMRK | termios.ISTRIP
+                   | termios.INLCR | termios.IGNCR | termios.ICRNL | termios.IXON | termios.IXOFF)
+        oflag &= ~termios.OPOST
+        lflag &= ~(termios.ECHO | termios.ECHONL | termios.ICANON | termios.ISIG | termios.IEXTEN)
+        cflag &= ~(termios.CSIZE | termios.PARENB | termios.CSTOPB)
+        cflag |= termios.CS8 | termios.CREAD | termios.CLOCAL
+        cc[termios.VMIN] = 0
+        cc[termios.VTIME] = 0
+        speed = _baud_constant(baudrate)
+        termios.tcsetattr(fd, termios.TCSANOW, [iflag, oflag, cflag, lflag, speed, speed, cc])
+    except Exception:
+        os.close(fd)
+        raise
+    return fd
+
+
+def pty_stand_in():
+    """(master_fd, slave_path) pair; write to master_fd to fake a DUT"""
+    master, slave = pty.openpty()
+    path = os.ttyname(slave)
+    os.close(slave)  # the reader opens the path itself, like a real port
+    return master, path
+
+
+class SerialLineReader:
+    """Line splitter over a non-blocking serial file descriptor"""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self._buf = bytearray()
+        self.bytes_read = 0
+
+    def drain_bytes(self):
+        """Everything readable right now, without waiting: b"" if nothing,
+        None once the port is gone (device unplugged, pty master closed)"""
+        data = bytearray()
+        closed = False
+        while True:
+            try:
+                chunk = os.read(self.fd, READ_CHUNK)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno != errno.EIO:
+                    raise
+                chunk = b""
+            if not chunk:
+                closed = True
+                break
+            data += chunk
+        self.bytes_read += len(data)
+        if closed and not data:
+            return None
+        return bytes(data)
+
+    def drain_lines(self):
+        """Complete lines (bytes, without line endings) readable right now,
+        or None once the port is gone"""
+        return self._lines(self.drain_bytes())
+
+    def _lines(self, data):
+        if data is None:
+            return self._take_all() or None
+        self._buf += data
+        return self._split()
+
+    def _split(self):
+        lines = []
+        start = 0
+        while True:
+            end = self._buf.find(b"\n", start)
+            if end < 0:
+                break
+            lines.append(bytes(self._buf[start:end]).rstrip(b"\r"))
+            start = end + 1
+        del self._buf[:start]
+        if len(self._buf) > MAX_LINE:
+            lines.append(bytes(self._buf))
+            self._buf.clear()
+        return lines
+
+    def _take_all(self):
+        lines = self._split()
+        if self._buf:
+            lines.append(bytes(self._buf).rstrip(b"\r"))
+            self._buf.clear()
+        return lines
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
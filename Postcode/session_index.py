@@ -0,0 +1,202 @@
+import bisect
+import os
+import struct
+import sys
+import threading
+from array import array
+
+# -----------------------------
+# Binary postcode sessions and a cross-session index
+# -----------------------------
+# Each reading is also saved next to its text log as <log name>.pcs:
+#
+#   header   <4s H H d I>  magic "PCOD", version, flags, start (unix time), count
+#   codes    count bytes, one postcode each
+#   deltas   count x uint32 LE, ms since the previous code (first: since start)
+#
+# SessionIndex loads those files once and then keeps, per session, the codes
+# and their cumulative ms offsets plus a code -> session -> positions map,
+# so questions across hundreds of boots are answered from memory without
+# opening a single text log. New sessions are added as they end; the log
+# directory's mtime tells when files were added or removed behind its back.
+
+MAGIC = b"PCOD"
+VERSION = 1
+HEADER = struct.Struct("<4sHHdI")
+SESSION_EXT = ".pcs"
+
+
+def session_path(log_path):
+    return os.path.splitext(log_path)[0] + SESSION_EXT
+
+
+def write_session(path, start, codes, deltas):
+    """Write a session file atomically; `deltas` is an array('I') of ms"""
+    deltas = array("I", deltas)
+    if sys.byteorder == "big":
+        deltas.byteswap()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, start, len(codes)))
+        f.write(bytes(codes))
+        f.write(deltas.tobytes())
+    os.replace(tmp, path)
+
+
+def read_session(path):
+    """(start, codes, deltas) from a session file; ValueError if malformed"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError("truncated header")
+    magic, version, _flags, start, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a postcode session file")
+    end = HEADER.size + count
+    if len(data) < end + 4 * count:
+        raise ValueError("truncated session")
+    deltas = array("I")
+    deltas.frombytes(data[end:end + 4 * count])
+    if sys.byteorder == "big":
+        deltas.byteswap()
+    return start, data[HEADER.size:end], deltas
+
+
+class Session:
+    __slots__ = ("name", "start", "codes", "times", "mtime")
+
+    def __init__(self, name, start, codes, deltas, mtime):
+        self.name = name
+        self.start = start
+        self.codes = codes
+        self.times = array("Q")       # ms since session start, per code
+        total = 0
+        for d in deltas:
+            total += d
+            self.times.append(total)
+        self.mtime = mtime
+
+    def summary(self):
+        return {
+            "session": self.name,
+            "log": self.name + ".txt",
+            "start": self.start,
+            "codes": len(self.codes),
+            "last_code": "%02x" % self.codes[-1] if self.codes else None,
+            "duration_ms": self.times[-1] if self.times else 0,
+        }
+
+
+class SessionIndex:
+    """code -> session -> positions over every .pcs file in a directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._sessions = {}           # name -> Session
+        self._positions = {}          # code byte -> {name: array('I') of positions}
+        self._dir_mtime = None
+
+    # ---- maintenance ----
+
+    def refresh(self):
+        """Pick up files added or removed since the last look"""
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._dir_mtime:
+            return
+        names = {f[:-len(SESSION_EXT)] for f in os.listdir(self.directory) if f.endswith(SESSION_EXT)}
+        with self._lock:
+            for name in set(self._sessions) - names:
+                self._drop(name)
+            known = set(self._sessions)
+        for name in names - known:
+            self.add(os.path.join(self.directory, name + SESSION_EXT))
+        self._dir_mtime = mtime
+
+    def add(self, path):
+        name = os.path.basename(path)[:-len(SESSION_EXT)]
+        try:
+            start, codes, deltas = read_session(path)
+            mtime = os.stat(path).st_mtime
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Skipping session file {path}: {e}")
+            return
+        session = Session(name, start, codes, deltas, mtime)
+        positions = {}
+        for i, code in enumerate(codes):
+            positions.setdefault(code, array("I")).append(i)
+        with self._lock:
+            self._drop(name)
+            self._sessions[name] = session
+            for code, pos in positions.items():
+                self._positions.setdefault(code, {})[name] = pos
+
+    def remove(self, name):
+        with self._lock:
+            self._drop(name)
+
+    def _drop(self, name):
+        session = self._sessions.pop(name, None)
+        if session is None:
+            return
+        for code in set(session.codes):
+            by_session = self._positions.get(code)
+            if by_session is not None:
+                by_session.pop(name, None)
+
+    # ---- queries ----
+
+    def sessions(self):
+        self.refresh()
+        with self._lock:
+            return sorted((s.summary() for s in self._sessions.values()), key=lambda s: s["start"], reverse=True)
+
+    def with_code(self, code):
+        """Sessions containing `code`, with how often and when it first appeared"""
+        self.refresh()
+        result = []
+        with self._lock:
+            for name, pos in self._positions.get(code, {}).items():
+                session = self._sessions[name]
+                result.append(dict(session.summary(), occurrences=len(pos), first_ms=session.times[pos[0]]))
+        return sorted(result, key=lambda s: s["start"], reverse=True)
+
+    def last_code(self, code):
+        """Sessions whose final code was `code` (e.g. where a boot stalled)"""
+        self.refresh()
+        with self._lock:
+            result = [s.summary() for s in self._sessions.values() if s.codes and s.codes[-1] == code]
+        return sorted(result, key=lambda s: s["start"], reverse=True)
+
+    def sequence(self, first, then, min_ms=0):
+        """Sessions where `then` followed `first` more than `min_ms` later.
+
+        Each occurrence of `first` is paired with the next `then` after it;
+        the slowest pairing per session is reported.
+        """
+        self.refresh()
+        result = []
+        with self._lock:
+            starts = self._positions.get(first, {})
+            ends = self._positions.get(then, {})
+            for name in starts.keys() & ends.keys():
+                session = self._sessions[name]
+                after = ends[name]
+                slowest = None
+                matches = 0
+                for i in starts[name]:
+                    j = bisect.bisect_right(after, i)
+                    if j == len(after):
+                        break
+                    took = session.times[after[j]] - session.times[i]
+                    if took > min_ms:
+                        matches += 1
+                        if slowest is None or took > slowest[0]:
+                            slowest = (took, session.times[i])
+                if slowest is not None:
+                    result.append(dict(session.summary(), matches=matches,
+                                       max_ms=slowest[0], at_ms=slowest[1]))
+        return sorted(result, key=lambda s: s["max_ms"], reverse=True)
@@ -1,73 +1,79 @@
-from flask import Flask, request, render_template
+from flask import Flask, Response, jsonify, request, render_template
 from flask_cors import CORS
-import subprocess
-import socket
+from flask_sock import Sock
 import os
-import signal
+import struct
 import time
-import re
+from capture_devices import FIRST_HUB_PORT, CaptureDevices
+from hid_metrics import HidMetrics
+from hid_writer import HidWriter
+from hid_keyboard import KeyboardState
+from hid_keymap import KEY_RELEASE, compile_text
+from hid_macros import MacroError, compile_macro, list_macros, load_macro, save_macro
+from hid_mouse import ABS_AXIS_MAX, MouseCoalescer, absolute_report, clamp_move, split_delta
+from screen_watch import DEFAULT_THRESHOLD, ScreenWatcher
+from snapshot import FrameGrabber
+from stream_recorder import RECORD_DIR, StreamRecorder
+from stream_quality import PROFILES, QualityController, profile_args
+from ustreamer_supervisor import UstreamerSupervisor
 
 app = Flask(__name__)
 # Allow all origins (for development)
 CORS(app)
+sock = Sock(app)
 
 KEYBOARD_PATH = "/dev/hidg0"
 MOUSE_PATH = "/dev/hidg1"
+ABS_MOUSE_PATH = "/dev/hidg2"
+TYPE_REPORT_GAP = 0.004  # default seconds between reports for /type
+TYPE_MAX_GAP = 1.0  # longest gap_ms /type accepts, in seconds
+RECORD_ON_START = True   # keep a rolling recording of the main stream while it runs
 
-import subprocess
-import re
+# One long-lived writer owns all gadget devices; hid_metrics times every
+# report from request receipt to the gadget write (see /metrics/hid)
+hid_metrics = HidMetrics()
+hid = HidWriter({"keyboard": KEYBOARD_PATH, "mouse": MOUSE_PATH, "abs_mouse": ABS_MOUSE_PATH},
+                metrics=hid_metrics)
+hid.start()
 
-# -----------------------------
-# Get USB capture devices and their paths
-# -----------------------------
-result = subprocess.run(["v4l2-ctl", "--list-devices"], capture_output=True, text=True)
-output = result.stdout
-
-devices = output.strip().split("\n\n")
-hub_port_mapping = {}  # map USB path to /dev/videoX
-
-for block in devices:
-    lines = block.splitlines()
-    if len(lines) < 2:
-        continue
-
-    device_name = lines[0]
-    if "usb" in device_name.lower():  # consider USB devices only
-        # USB path is inside parentheses
-        match = re.search(r"\((usb[^\)]+)\)", device_name)
-        if match:
-            usb_path = match.group(1)
-            # Collect all /dev/video* lines in this block
-            video_lines = [line.strip() for line in lines[1:] if line.strip().startswith("/dev/video")]
-            if video_lines:
-                # Pick the lowest numbered /dev/video device
-                hub_port_mapping[usb_path] = sorted(video_lines, key=lambda x: int(x.replace("/dev/video","")))[0]
 
-# -----------------------------
-# Select the device for the first hub port or fallback
-# -----------------------------
-usb_video = hub_port_mapping.get("usb-0000:01:00.0-1.1.1")  # first hub port
+@app.before_request
+def _hid_request_received():
+    hid_metrics.begin()
 
-# Fallback: if first hub port doesn't exist (single capture connected directly)
-if not usb_video and hub_port_mapping:
-    usb_video = list(hub_port_mapping.values())[0]
 
-print(f"Virtual Desk video device: {usb_video}")
+@app.teardown_request
+def _hid_request_done(exc):
+    hid_metrics.end()
 
 
-USTREAMER_CMD = [
-    "./ustreamer/ustreamer",
-    f"--device={usb_video}",
-    "--format=uyvy",
-    "--resolution=1920x1080",
-    "--encoder=m2m-image",
-    "--drop-same-frames=45",
-    "--host=0.0.0.0",
-    "--port=9000"
-]
-
-
-ustream_proc = None
+# -----------------------------
+# USB capture devices and their paths
+# -----------------------------
+# Read from sysfs on first use and refreshed on /dev hotplug events, so a
+# re-plugged capture dongle is found without restarting the service
+capture_devices = CaptureDevices()
+capture_devices.watch()
+
+
+def ustreamer_cmd(usb_video, port=9000, profile="high"):
+    # Resolution, JPEG quality, fps and drop-same-frames come from the profile
+    return [
+        "./ustreamer/ustreamer",
+        f"--device={usb_video}",
+        "--format=uyvy",
+        "--encoder=m2m-image",
+        *profile_args(profile),
+        "--host=0.0.0.0",
+        f"--port={port}"
+    ]
+
+
+# One supervised uStreamer per capture device; the first hub port keeps :9000
+streams = UstreamerSupervisor(ustreamer_cmd, first_port_path=FIRST_HUB_PORT)
+capture_devices.on_change(streams.sync)
+# Steps each stream's quality profile up or down from its viewers' fps
+stream_quality = QualityController(streams)
 
 KEY_LEFT_CTRL = 0xE0
 KEY_LEFT_SHIFT = 0xE1
@@ -96,6 +102,7 @@ KEYCODES = {
     13: 0x28,  # Enter
     27: 0x29,  # Esc
     8: 0x2A,   # Backspace
+    45: 0x49,  # Insert
     46: 0x4C,  # Delete
     35: 0x4D,  # End
     36: 0x4A,  # Home
@@ -105,19 +112,11 @@ KEYCODES = {
     38: 0x52,  # Up arrow
     39: 0x4F,  # Right arrow
     40: 0x51,  # Down arrow
-    # Symbols and punctuation
+    # Symbols and punctuation (Firefox codes; others are under Extra keys)
     32: 0x2C,  # Space
-    45: 0x2D,  # -
     61: 0x2E,  # =
-    91: 0x2F,  # [
-    93: 0x30,  # ]
-    92: 0x31,  # Backslash
     59: 0x33,  # ;
-    39: 0x4F,  # '
-    96: 0x35,  # `
-    44: 0x36,  # ,
-    46: 0x37,  # .
-    47: 0x38,  # /
+    173: 0x2D, # -
     # Modifier keys (used only as modifiers, not sent via KEYCODES)
     16: 0xE1,  # Shift (left)
     17: 0xE0,  # Ctrl (left)
@@ -174,45 +173,29 @@ SHORTCUTS = {
     "f7":[0x40], "f8":[0x41], "f9":[0x42], "f10":[0x43], "f11":[0x44], "f12":[0x45],
 }
 
-SHIFTED_KEYS = {
-    33, 34, 35, 36, 37, 38, 39, 40, 41,
-    126, 33, 64, 35, 36, 37, 94, 38, 42, 40, 41,
-    95, 43, 123, 125, 124, 58, 34, 60, 62, 63
-}
-
 def send_keycode(keycode, modifier):
-    report = bytes([modifier, 0x00, keycode, 0, 0, 0, 0, 0])
-    with open(KEYBOARD_PATH, "rb+") as fd:
-        fd.write(report)
-        fd.write(b'\x00\x00\x00\x00\x00\x00\x00\x00')
+    keyboard_state.tap([keycode], 0.0, modifier)
 
 
 def send_keys(hid_codes):
-    modifier = 0x00
-    keys = []
+    # Press over any held keys, hold for 50 ms on the writer thread, then release
+    keyboard_state.tap(hid_codes, 0.05)
 
-    for code in hid_codes:
-        if 0xE0 <= code <= 0xE7:
-            modifier |= (1 << (code - 0xE0))
-        else:
-            if len(keys) < 6:
-                keys.append(code)
 
-    while len(keys) < 6:
-        keys.append(0x00)
+def send_mouse(x=0, y=0, buttons=0, origin=None):
+    # Large deltas become several in-range reports instead of wrapping
+    reports = [bytes([buttons & 0x07, step_x & 0xFF, step_y & 0xFF])
+               for step_x, step_y in split_delta(x, y)]
+    hid.submit_many("mouse", reports, origin=origin)
 
-    report = bytes([modifier, 0x00] + keys)
 
-    with open(KEYBOARD_PATH, "rb+") as fd:
-        fd.write(report)  # Press keys
-        time.sleep(0.05)
-        fd.write(b'\x00\x00\x00\x00\x00\x00\x00\x00')  # Release
+# Browser mousemoves are summed and flushed once per poll interval
+mouse_coalescer = MouseCoalescer(send_mouse)
 
 
-def send_mouse(x=0, y=0, buttons=0):
-    report = bytes([buttons & 0x07, x & 0xFF, y & 0xFF])
-    with open(MOUSE_PATH, "wb") as f:
-        f.write(report)
+def send_mouse_abs(x, y, buttons=0):
+    """Place the pointer at (x, y) in 0..ABS_AXIS_MAX units of the frame"""
+    hid.submit("abs_mouse", absolute_report(x, y, buttons))
 
 def smooth_mouse_delta(x, y, threshold=1):
     x = x if abs(x) >= threshold else 0
@@ -231,10 +214,8 @@ def shortcut(name):
         return f"Sent {name}", 200
     return "Unknown shortcut", 400
 
-@app.route("/keyboard", methods=["POST"])
-def keyboard():
-    data = request.json
-    js_keycodes = data.get("keycodes", [])
+def send_js_keycodes(js_keycodes):
+    """Press and release the keys for a list of browser (JS) keycodes"""
     modifier = 0x00
     hid_keycodes = []
 
@@ -249,54 +230,471 @@ def keyboard():
             if hid_code:
                 hid_keycodes.append(hid_code)
 
-    if not hid_keycodes:
-        hid_keycodes = [0]  # No key pressed, just modifiers
-
     try:
-        report = bytes([modifier, 0x00] + hid_keycodes[:6] + [0] * (6 - len(hid_keycodes)))
         print(f"[KEYBOARD] modifier={modifier:#04x}, keys={hid_keycodes}")
-        with open(KEYBOARD_PATH, "rb+") as fd:
-            fd.write(report)
-            time.sleep(0.01)
-            fd.write(b'\x00\x00\x00\x00\x00\x00\x00\x00')
+        keyboard_state.tap(hid_keycodes, 0.01, modifier)
     except Exception as e:
         print("[!] Keyboard write error:", e)
 
+
+# Held-key state for down/up events; reports go out only on change
+keyboard_state = KeyboardState(lambda report: hid.submit("keyboard", report),
+                               lambda items: hid.submit_timed("keyboard", items))
+
+
+def key_event(js_keycode, pressed):
+    hid_code = KEYCODES.get(js_keycode, 0)
+    if not hid_code:
+        return False
+    if pressed:
+        return keyboard_state.down(hid_code)
+    return keyboard_state.up(hid_code)
+
+
+def move_mouse(x, y, buttons):
+    x, y = smooth_mouse_delta(x, y)
+    # The coalescer flushes on its own thread; hand it this request's receipt time
+    mouse_coalescer.move(x, y, buttons, hid_metrics.origin())
+
+
+@app.route("/keyboard", methods=["POST"])
+def keyboard():
+    """Either {"keycodes": [...]} to tap a chord, or
+    {"event": "down"|"up", "keycode": n} to change held-key state"""
+    data = request.json
+    event = data.get("event")
+    if event in ("down", "up"):
+        key_event(int(data.get("keycode", 0)), event == "down")
+    elif event == "release_all":
+        keyboard_state.release_all()
+    else:
+        send_js_keycodes(data.get("keycodes", []))
     return "OK"
 
 
 @app.route("/mouse", methods=["POST"])
 def mouse():
     data = request.json
-    x = int(data.get("x", 0))
-    y = int(data.get("y", 0))
+    x = clamp_move(data.get("x", 0))
+    y = clamp_move(data.get("y", 0))
     buttons = int(data.get("buttons", 0))
-    x, y = smooth_mouse_delta(x, y)
-    send_mouse(x, y, buttons)
+    move_mouse(x, y, buttons)
     return "OK"
 
+@app.route("/mouse_abs", methods=["POST"])
+def mouse_abs():
+    """Absolute pointer; x and y are fractions (0.0-1.0) of the video frame"""
+    data = request.json
+    x = float(data.get("x", 0)) * ABS_AXIS_MAX
+    y = float(data.get("y", 0)) * ABS_AXIS_MAX
+    buttons = int(data.get("buttons", 0))
+    send_mouse_abs(x, y, buttons)
+    if "abs_mouse" in hid.stalled():
+        # Firmware often polls only the boot mouse, never the tablet interface
+        return jsonify({"error": "The host is not reading the absolute pointer; use relative mode"}), 503
+    return "OK"
+
+@app.route("/type", methods=["POST"])
+def type_text():
+    """Type a string; optional gap_ms (0-1000) sets the time between reports"""
+    data = request.json
+    text = str(data.get("text", ""))
+    try:
+        gap = float(data.get("gap_ms", TYPE_REPORT_GAP * 1000)) / 1000
+    except (TypeError, ValueError):
+        return {"status": "error", "detail": "gap_ms must be a number"}, 400
+    return type_string(text, gap)
+
+
+def type_string(text, gap=TYPE_REPORT_GAP):
+    # A negative gap would schedule each release before its press
+    gap = min(gap, TYPE_MAX_GAP) if gap > 0 else 0.0
+    reports, skipped = compile_text(text)
+    if not hid.submit_many("keyboard", reports, gap):
+        return {"status": "error", "detail": "HID queue full"}, 503
+    return {"status": "queued", "chars": len(reports) // 2, "skipped": "".join(skipped)}
+
+# -----------------------------
+# Macros (see hid_macros.py for the file format)
+# -----------------------------
+@app.route("/macros")
+def macros():
+    return {"macros": list_macros()}
+
+
+@app.route("/macro/<name>", methods=["POST"])
+def run_macro(name):
+    """Queue a stored macro; its timing runs entirely on the Pi"""
+    try:
+        items = compile_macro(load_macro(name))
+    except FileNotFoundError:
+        return {"status": "error", "detail": f"no macro '{name}'"}, 404
+    except (MacroError, ValueError) as e:
+        return {"status": "error", "detail": str(e)}, 400
+    if not hid.submit_timed("keyboard", items):
+        return {"status": "error", "detail": "HID queue full"}, 503
+    duration = sum(hold for _, hold in items)
+    print(f"[MACRO] {name}: {len(items)} reports over {duration:.1f}s")
+    return {"status": "started", "reports": len(items), "duration_ms": int(duration * 1000)}
+
+
+@app.route("/macro/<name>", methods=["PUT"])
+def store_macro(name):
+    try:
+        save_macro(name, request.json)
+    except (MacroError, ValueError, AttributeError) as e:
+        return {"status": "error", "detail": str(e)}, 400
+    return {"status": "saved", "name": name}
+
+
+@app.route("/macro_stop", methods=["POST"])
+def stop_macro():
+    """Abort queued keyboard reports (running macros, long /type) and release all keys"""
+    hid.cancel("keyboard")
+    keyboard_state.release_all()
+    hid.submit("keyboard", KEY_RELEASE)
+    return {"status": "stopped"}
+
+# -----------------------------
+# WebSocket input channel
+# -----------------------------
+# One persistent socket per browser tab carrying binary frames:
+#   byte 0      message type
+#   bytes 1..   packed payload (little endian)
+# The HTTP routes above stay as a fallback for clients without WebSocket.
+WS_KEYBOARD = 0x01   # payload: one byte per JS keycode
+WS_MOUSE = 0x02      # payload: int16 dx, int16 dy, uint8 buttons
+WS_SHORTCUT = 0x03   # payload: utf-8 shortcut name
+WS_MOUSE_ABS = 0x04  # payload: uint16 x, uint16 y (0..ABS_AXIS_MAX), uint8 buttons
+WS_TYPE = 0x05       # payload: utf-8 text to type
+WS_KEY_DOWN = 0x06   # payload: uint8 JS keycode
+WS_KEY_UP = 0x07     # payload: uint8 JS keycode
+WS_KEY_RELEASE_ALL = 0x08  # no payload
+
+WS_MOUSE_FMT = struct.Struct("<hhB")
+WS_MOUSE_ABS_FMT = struct.Struct("<HHB")
+
+
+def ws_keyboard(payload):
+    send_js_keycodes(list(payload))
+
+
+def ws_key_down(payload):
+    key_event(payload[0], True)
+
+
+def ws_key_up(payload):
+    key_event(payload[0], False)
+
+
+def ws_key_release_all(payload):
+    keyboard_state.release_all()
+
+
+def ws_mouse(payload):
+    x, y, buttons = WS_MOUSE_FMT.unpack_from(payload)
+    move_mouse(x, y, buttons)
+
+
+def ws_mouse_abs(payload):
+    x, y, buttons = WS_MOUSE_ABS_FMT.unpack_from(payload)
+    send_mouse_abs(x, y, buttons)
+
+
+def ws_type(payload):
+    type_string(payload.decode("utf-8", "replace"))
+
+
+def ws_shortcut(payload):
+    name = payload.decode("utf-8", "replace")
+    if name in SHORTCUTS:
+        send_keys(SHORTCUTS[name])
+
+
+WS_HANDLERS = {
+    WS_KEYBOARD: ws_keyboard,
+    WS_MOUSE: ws_mouse,
+    WS_SHORTCUT: ws_shortcut,
+    WS_MOUSE_ABS: ws_mouse_abs,
+    WS_TYPE: ws_type,
+    WS_KEY_DOWN: ws_key_down,
+    WS_KEY_UP: ws_key_up,
+    WS_KEY_RELEASE_ALL: ws_key_release_all,
+}
+
+
+def handle_ws_frame(frame):
+    handler = WS_HANDLERS.get(frame[0])
+    if handler is None:
+        return
+    hid_metrics.begin()
+    try:
+        handler(bytes(frame[1:]))
+    except (struct.error, ValueError, IndexError) as e:
+        print("[!] Bad HID frame:", e)
+    finally:
+        hid_metrics.end()
+
+
+@sock.route("/ws/hid")
+def ws_hid(ws):
+    print("[*] HID WebSocket connected")
+    try:
+        while True:
+            frame = ws.receive()
+            if not isinstance(frame, (bytes, bytearray)) or not frame:
+                continue  # text frames are not part of the protocol
+            handle_ws_frame(frame)
+    finally:
+        # flask-sock ends the loop by raising ConnectionClosed from receive()
+        keyboard_state.release_all()  # never leave a key stuck down on the DUT
+        print("[*] HID WebSocket closed")
+
+@app.route("/metrics/hid")
+def hid_latency_metrics():
+    # Per-stage latency percentiles in ms; ?reset=1 starts a new window
+    report = hid_metrics.report()
+    report["dropped"] = hid.dropped
+    report["stalled"] = hid.stalled()
+    if request.args.get("reset") in ("1", "true"):
+        hid_metrics.reset()
+    return jsonify(report)
+
+
+@app.route("/capture_devices")
+def list_capture_devices():
+    return {"devices": capture_devices.mapping()}
+
 @app.route("/start_stream")
 def start_stream():
-    global ustream_proc
+    if streams.running():
+        return {"status": "already running", "streams": streams.status()}
+
+    mapping = capture_devices.mapping()
+    if not mapping:
+        return {"status": "error", "detail": "no USB capture device found"}
+    print(f"Virtual Desk video devices: {mapping}")
+
+    print("[*] Starting uStreamer...")
+    streams.start(mapping)
+    stream_quality.start()
+    if RECORD_ON_START:
+        stream_recorder(9000).start()
+    return {"status": "started", "streams": streams.status()}
+
 
-    if ustream_proc is not None and ustream_proc.poll() is None:
-        return {"status": "already running"}
+@app.route("/stop_stream", methods=["GET", "POST"])
+def stop_stream():
+    for recorder in recorders.values():
+        recorder.stop()
+    streams.stop()
+    return {"status": "stopped"}
 
+
+@app.route("/streams")
+def stream_status():
+    """Per-instance uStreamer state, port and uptime"""
+    return {"running": streams.running(), "streams": streams.status()}
+
+
+@app.route("/streams/restart", methods=["POST"])
+def restart_streams():
+    usb_path = (request.get_json(silent=True) or {}).get("usb_path")
     try:
-        print("[*] Starting uStreamer...")
-        ustream_proc = subprocess.Popen(USTREAMER_CMD)
-        return {"status": "started"}
-    except Exception as e:
-        return {"status": "error", "detail": str(e)}
+        streams.restart(usb_path)
+    except KeyError:
+        return {"status": "error", "detail": f"unknown capture {usb_path}"}, 404
+    return {"status": "restarting"}
+
+@app.route("/stream_quality")
+def stream_quality_status():
+    """Active profile per stream and why it was chosen"""
+    return {"profiles": PROFILES, "streams": stream_quality.status()}
+
+
+@app.route("/stream_quality", methods=["POST"])
+def set_stream_quality():
+    """{"profile": name, "auto": bool, "usb_path": optional} - pin or re-seed a profile"""
+    data = request.get_json(silent=True) or {}
+    known = [s["usb_path"] for s in streams.status()]
+    usb_path = data.get("usb_path")
+    if usb_path is not None and usb_path not in known:
+        return {"status": "error", "detail": f"unknown capture {usb_path}"}, 404
+    try:
+        for path in [usb_path] if usb_path else known:
+            stream_quality.set_profile(path, data.get("profile", "high"), auto=bool(data.get("auto", False)))
+    except ValueError as e:
+        return {"status": "error", "detail": str(e)}, 400
+    return {"status": "ok", "streams": stream_quality.status()}
 
-if __name__ == "__main__":
-    ustream_proc = None
+# -----------------------------
+# Still frames from the running stream
+# -----------------------------
+grabbers = {}  # uStreamer port -> FrameGrabber sharing one upstream connection
+watchers = {}  # uStreamer port -> ScreenWatcher
+recorders = {}  # uStreamer port -> StreamRecorder
+
+
+def frame_grabber(port=9000):
+    if port not in grabbers:
+        grabbers[port] = FrameGrabber(f"http://127.0.0.1:{port}")
+    return grabbers[port]
+
+
+def screen_watcher(port=9000):
+    if port not in watchers:
+        watchers[port] = ScreenWatcher(frame_grabber(port))
+    return watchers[port]
+
+
+def stream_recorder(port=9000):
+    if port not in recorders:
+        recorders[port] = StreamRecorder(frame_grabber(port), os.path.join(RECORD_DIR, str(port)))
+    return recorders[port]
+
+
+def stream_port(args):
+    """?port= of a supervised stream (default 9000), or None if unknown"""
+    port = args.get("port", 9000, type=int)
+    if port != 9000 and port not in {s["port"] for s in streams.status()}:
+        return None
+    return port
+
+
+@app.route("/snapshot")
+def snapshot():
+    """Latest JPEG (optionally ?width=N thumbnail); honours If-None-Match"""
+    port = stream_port(request.args)
+    if port is None:
+        return {"status": "error", "detail": "no stream on that port"}, 404
+    grabber = frame_grabber(port)
+    frame = grabber.latest()
+    if frame is None:
+        return {"status": "error", "detail": grabber.error or "no frame yet"}, 503
+
+    width = request.args.get("width", type=int)
+    if width:
+        try:
+            etag, jpeg = grabber.thumbnail(frame, min(max(width, 16), 1920))
+        except RuntimeError as e:
+            return {"status": "error", "detail": str(e)}, 501
+    else:
+        etag, jpeg = frame.etag, frame.jpeg
+
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(jpeg, mimetype="image/jpeg")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+# -----------------------------
+# Screen-change waits for automation
+# -----------------------------
+@app.route("/screen/wait_stable", methods=["POST"])
+def screen_wait_stable():
+    """Block until the screen stops changing: {timeout, threshold, stable_ms}"""
+    data = request.get_json(silent=True) or {}
+    port = stream_port(request.args)
+    if port is None:
+        return {"status": "error", "detail": "no stream on that port"}, 404
+    try:
+        result = screen_watcher(port).wait_until_stable(
+            timeout=min(float(data.get("timeout", 30)), 300),
+            threshold=float(data.get("threshold", DEFAULT_THRESHOLD)),
+            stable_for=float(data.get("stable_ms", 1000)) / 1000,
+        )
+    except RuntimeError as e:
+        return {"status": "error", "detail": str(e)}, 501
+    return result
+
+
+@app.route("/screen/mark", methods=["POST"])
+def screen_mark():
+    """Remember the current frame for a later /screen/changes query"""
+    port = stream_port(request.args)
+    if port is None:
+        return {"status": "error", "detail": "no stream on that port"}, 404
+    try:
+        mark = screen_watcher(port).mark()
+    except RuntimeError as e:
+        return {"status": "error", "detail": str(e)}, 501
+    if mark is None:
+        return {"status": "error", "detail": "no frame yet"}, 503
+    return {"mark": mark}
+
+
+@app.route("/screen/changes")
+def screen_changes():
+    """Regions changed since ?mark=N, as fractions of the frame"""
+    port = stream_port(request.args)
+    if port is None:
+        return {"status": "error", "detail": "no stream on that port"}, 404
+    threshold = request.args.get("threshold", DEFAULT_THRESHOLD, type=float)
+    try:
+        result = screen_watcher(port).changes_since(request.args.get("mark", -1, type=int), threshold)
+    except KeyError:
+        return {"status": "error", "detail": "unknown mark"}, 404
+    except RuntimeError as e:
+        return {"status": "error", "detail": str(e)}, 501
+    if result is None:
+        return {"status": "error", "detail": "no frame yet"}, 503
+    return result
+
+# -----------------------------
+# Rolling recording for post-mortem
+# -----------------------------
+@app.route("/recording")
+def recording_status():
+    port = stream_port(request.args)
+    if port is None:
+        return {"status": "error", "detail": "no stream on that port"}, 404
+    return stream_recorder(port).status()
+
+
+@app.route("/recording/start", methods=["POST"])
+def recording_start():
+    port = stream_port(request.args)
+    if port is None:
+        return {"status": "error", "detail": "no stream on that port"}, 404
+    stream_recorder(port).start()
+    return {"status": "recording"}
+
+
+@app.route("/recording/stop", methods=["POST"])
+def recording_stop():
+    port = stream_port(request.args)
+    if port is None:
+        return {"status": "error", "detail": "no stream on that port"}, 404
+    stream_recorder(port).stop()
+    return {"status": "stopped"}
+
+
+@app.route("/recording/export")
+def recording_export():
+    """Raw MJPEG for ?start=&end= (epoch seconds) or the ?last=N seconds"""
+    port = stream_port(request.args)
+    if port is None:
+        return {"status": "error", "detail": "no stream on that port"}, 404
+    now = time.time()
+    last = request.args.get("last", type=float)
+    start = now - last if last else request.args.get("start", now - 60, type=float)
+    end = request.args.get("end", now, type=float)
+    filename = f"recording_{port}_{int(start)}-{int(end)}.mjpeg"
+    return Response(
+        stream_recorder(port).export(start, end),
+        mimetype="video/x-motion-jpeg",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
+if __name__ == "__main__":
     try:
         print("[*] Starting Flask app on port 5000...")
         app.run(host="0.0.0.0", port=5000)
     finally:
+        hid.stop()
+        for recorder in recorders.values():
+            recorder.stop()
         print("[*] Shutting down uStreamer...")
-        if ustream_proc is not None and ustream_proc.poll() is None:
-            ustream_proc.send_signal(signal.SIGINT)
-            ustream_proc.wait()
\ No newline at end of file
+        streams.stop()
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""Per-report write cost: open-per-report vs. the persistent HidWriter.
+
+A named FIFO stands in for /dev/hidg*; a reader thread drains it the way the
+USB host would poll the gadget endpoint.
+
+    python bench/bench_hid_fifo.py [reports]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hid_writer import HidWriter  # noqa: E402
+
+REPORT = bytes([0x00, 0x00, 0x04, 0, 0, 0, 0, 0])
+
+
+def start_drain(path, expected):
+    """Read `expected` bytes from the FIFO, return (thread, done event)"""
+    done = threading.Event()
+
+    def drain():
+        got = 0
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            while got < expected:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    # Writer closed its end (open-per-report case); wait for the next one
+                    os.close(fd)
+                    fd = os.open(path, os.O_RDONLY)
+                    continue
+                got += len(chunk)
+        finally:
+            os.close(fd)
+            done.set()
+
+    t = threading.Thread(target=drain, daemon=True)
+    t.start()
+    return t, done
+
+
+def bench_open_per_report(path, n):
+    _, done = start_drain(path, n * len(REPORT))
+    start = time.perf_counter()
+    for _ in range(n):
+        with open(path, "wb") as f:
+            f.write(REPORT)
+    done.wait()
+    return time.perf_counter() - start, None
+
+
+def bench_persistent(path, n):
+    _, done = start_drain(path, n * len(REPORT))
+    writer = HidWriter({"kbd": path}, maxsize=n + 1)
+    writer.start()
+    start = time.perf_counter()
+    for _ in range(n):
+        writer.submit("kbd", REPORT)
+    submitted = time.perf_counter() - start
+    writer.wait_idle()
+    done.wait()
+    total = time.perf_counter() - start
+    writer.stop()
+    return total, submitted
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hidg0")
+        os.mkfifo(path)
+
+        before, _ = bench_open_per_report(path, n)
+        after, caller = bench_persistent(path, n)
+
+    print(f"reports: {n}")
+    print(f"open-per-report : {before / n * 1e6:8.2f} us/report")
+    print(f"HidWriter total : {after / n * 1e6:8.2f} us/report")
+    print(f"HidWriter caller: {caller / n * 1e6:8.2f} us/report (time a request thread spends)")
+
+
+if __name__ == "__main__":
+    main()
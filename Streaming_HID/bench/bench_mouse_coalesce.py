@@ -0,0 +1,52 @@
+"""Report count for a fast drag, with and without MouseCoalescer.
+
+Replays a synthetic drag (one event every `gap` seconds, deltas up to +-8
+with occasional +-400 flicks) and checks the total movement is preserved.
+
+    python bench/bench_mouse_coalesce.py [events] [gap]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hid_mouse import MouseCoalescer, split_delta  # noqa: E402
+
+
+def make_drag(n, seed=1):
+    rnd = random.Random(seed)
+    events = []
+    for i in range(n):
+        span = 400 if i % 97 == 0 else 8
+        events.append((rnd.randint(-span, span), rnd.randint(-span, span)))
+    return events
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    gap = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0005
+    events = make_drag(n)
+    want = (sum(e[0] for e in events), sum(e[1] for e in events))
+
+    # Before: one report per event (plus splits, now that wrapping is fixed)
+    direct = [step for dx, dy in events for step in split_delta(dx, dy)]
+
+    # After: coalesced at the poll interval
+    written = []
+    coalescer = MouseCoalescer(lambda dx, dy, b, origin: written.extend(split_delta(dx, dy)))
+    for dx, dy in events:
+        coalescer.move(dx, dy, 1)
+        time.sleep(gap)
+    coalescer.flush()
+
+    got = (sum(s[0] for s in written), sum(s[1] for s in written))
+    assert got == want, (got, want)
+    print(f"events: {n} over {n * gap:.2f}s, total movement {want}")
+    print(f"per-event reports: {len(direct)}")
+    print(f"coalesced reports: {len(written)} ({len(direct) / max(1, len(written)):.1f}x fewer)")
+
+
+if __name__ == "__main__":
+    main()
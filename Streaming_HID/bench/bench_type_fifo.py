@@ -0,0 +1,71 @@
+"""Characters per second for /type vs. one /keyboard press per character.
+
+A named FIFO stands in for /dev/hidg0. The "per-key" path reproduces the old
+/keyboard handler (open, press, 10 ms sleep, release) without the HTTP
+round trip, so real-world numbers for it are lower still.
+
+    python bench/bench_type_fifo.py [chars]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_hid_fifo import start_drain  # noqa: E402
+from hid_keymap import ASCII_REPORTS, KEY_RELEASE, compile_text  # noqa: E402
+from hid_writer import HidWriter  # noqa: E402
+
+SAMPLE = "fs0:\\EFI\\Boot\\bootx64.efi -Password=Tr0ub4dor&3 | echo \"done\"\n"
+
+
+def bench_per_key(path, text):
+    _, done = start_drain(path, len(text) * 16)
+    start = time.perf_counter()
+    for ch in text:
+        with open(path, "wb") as fd:
+            fd.write(ASCII_REPORTS[ch])
+            time.sleep(0.01)
+            fd.write(KEY_RELEASE)
+    done.wait()
+    return time.perf_counter() - start
+
+
+def bench_type(path, text, gap):
+    reports, skipped = compile_text(text)
+    assert not skipped, skipped
+    _, done = start_drain(path, len(reports) * 8)
+    writer = HidWriter({"kbd": path})
+    writer.start()
+    start = time.perf_counter()
+    writer.submit_many("kbd", reports, gap)
+    writer.wait_idle()
+    done.wait()
+    elapsed = time.perf_counter() - start
+    writer.stop()
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    text = (SAMPLE * (n // len(SAMPLE) + 1))[:n]
+    compile_start = time.perf_counter()
+    compile_text(text)
+    compile_time = time.perf_counter() - compile_start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hidg0")
+        os.mkfifo(path)
+        per_key = bench_per_key(path, text[:200])
+        results = [(gap, bench_type(path, text, gap)) for gap in (0.0, 0.001, 0.004)]
+
+    print(f"chars: {n} (compile {compile_time / n * 1e6:.2f} us/char)")
+    print(f"per-key /keyboard path : {200 / per_key:10.0f} chars/s")
+    for gap, elapsed in results:
+        label = f"/type gap={gap * 1000:.0f} ms"
+        print(f"{label:<23}: {n / elapsed:10.0f} chars/s")
+
+
+if __name__ == "__main__":
+    main()
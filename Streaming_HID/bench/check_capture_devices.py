@@ -0,0 +1,94 @@
+"""Capture-device discovery against a fake /sys/class/video4linux tree.
+
+Lays out sysfs the way a Pi 4 does: class entries are symlinks into
+/sys/devices, and each node's `device` link points at the USB interface
+(1-1.1.1:1.0), not the USB device. Checks the bus_info derived for USB
+dongles, that platform nodes (ISP, codec) are skipped, that a dongle's
+lowest /dev/videoN wins, and the primary pick; then times a scan.
+
+    python bench/check_capture_devices.py [scans]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from capture_devices import CaptureDevices, primary_path, scan, usb_bus_info  # noqa: E402
+
+CONTROLLER = "0000:01:00.0"
+PCI = "devices/platform/scb/fd500000.pcie/pci0000:00/0000:00:00.0/" + CONTROLLER
+PLATFORM = "devices/platform/soc/fe00b840.mailbox/bcm2835-codec"
+
+
+def usb_interface(devpath):
+    """sysfs directory of interface 1.0 of the USB device at hub path `devpath`"""
+    parts = devpath.split(".")
+    hops = ["1-" + ".".join(parts[:i]) for i in range(1, len(parts) + 1)]
+    return "/".join([PCI, "usb1"] + hops + [f"1-{devpath}:1.0"])
+
+
+def add_node(root, index, parent):
+    """Create video<index> under `parent` plus its class symlink"""
+    name = f"video{index}"
+    node = os.path.join(root, parent, "video4linux", name)
+    os.makedirs(node)
+    os.symlink(os.path.relpath(os.path.join(root, parent), node), os.path.join(node, "device"))
+    cls = os.path.join(root, "class", "video4linux")
+    os.makedirs(cls, exist_ok=True)
+    os.symlink(os.path.relpath(node, cls), os.path.join(cls, name))
+
+
+def remove_node(root, index):
+    os.unlink(os.path.join(root, "class", "video4linux", f"video{index}"))
+
+
+def main():
+    scans = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    root = tempfile.mkdtemp(prefix="sysfs-")
+    sysfs = os.path.join(root, "class", "video4linux")
+    try:
+        # Dongle on the first hub port: capture node plus its metadata node
+        add_node(root, 1, usb_interface("1.1.1"))
+        add_node(root, 0, usb_interface("1.1.1"))
+        # Second dongle, enumerated after it
+        add_node(root, 3, usb_interface("1.1.2"))
+        add_node(root, 2, usb_interface("1.1.2"))
+        # Pi codec / ISP nodes, which are not USB
+        for index in (10, 11, 12):
+            add_node(root, index, PLATFORM)
+
+        first = f"usb-{CONTROLLER}-1.1.1"
+        second = f"usb-{CONTROLLER}-1.1.2"
+        device = os.path.realpath(os.path.join(sysfs, "video0", "device"))
+        assert device.endswith("/1-1.1.1/1-1.1.1:1.0"), device
+        assert usb_bus_info(device) == first, usb_bus_info(device)
+        assert usb_bus_info(os.path.realpath(os.path.join(sysfs, "video10", "device"))) is None
+
+        mapping = scan(sysfs, "/dev")
+        assert mapping == {first: "/dev/video0", second: "/dev/video2"}, mapping
+        assert primary_path(mapping, first) == first
+        print(f"mapping: {mapping}")
+
+        # Without the first hub port the lowest node is the primary
+        remove_node(root, 0)
+        remove_node(root, 1)
+        devices = CaptureDevices(sysfs, "/dev")
+        assert devices.refresh() == {second: "/dev/video2"}
+        assert devices.primary(first) == "/dev/video2"
+        assert primary_path({}, first) is None
+        print(f"after unplug: {devices.mapping()}, primary {devices.primary(first)}")
+
+        start = time.perf_counter()
+        for _ in range(scans):
+            scan(sysfs, "/dev")
+        elapsed = time.perf_counter() - start
+        print(f"scan: {elapsed / scans * 1e6:.0f} us over {scans} scans")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Replay recorded HID input through the app and report /metrics/hid.
+
+Named FIFOs stand in for /dev/hidg0..2, each drained by a reader thread the
+way the USB host polls the gadget endpoints. Input is replayed at its
+recorded pace through the real request paths: HTTP events go through the
+Flask test client, WebSocket frames through the /ws/hid frame handler.
+
+A recording is JSON lines, one event per line, `t` in seconds from start:
+
+    {"t": 0.000, "ws": "0206000000000000"}                 # hex WebSocket frame
+    {"t": 0.120, "http": "/type", "json": {"text": "root"}}
+    {"t": 0.500, "http": "/mouse_abs", "json": {"x": 0.5, "y": 0.5, "buttons": 1}}
+
+Without a file a synthetic session is replayed: WebSocket mouse motion at
+125 Hz, key down/up events, a few typed lines and shortcuts.
+
+    python bench/hid_loadgen.py [recording.jsonl] [--speed N] [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app as hid_app  # noqa: E402
+from hid_metrics import STAGES  # noqa: E402
+
+
+def drain_forever(path, stop):
+    """Keep reading a FIFO until `stop` is set"""
+    def drain():
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            while not stop.is_set():
+                try:
+                    if not os.read(fd, 65536):
+                        time.sleep(0.001)
+                except BlockingIOError:
+                    time.sleep(0.0005)
+        finally:
+            os.close(fd)
+
+    t = threading.Thread(target=drain, daemon=True)
+    t.start()
+    return t
+
+
+def synthetic_session(seconds=5.0):
+    events = []
+    t = 0.0
+    while t < seconds:
+        # 125 Hz mouse motion from the browser
+        events.append({"t": round(t, 4), "ws": bytes([hid_app.WS_MOUSE]).hex()
+                       + hid_app.WS_MOUSE_FMT.pack(6, -3, 0).hex()})
+        t += 0.008
+    for i in range(int(seconds * 4)):
+        t = i * 0.25
+        keycode = 65 + i % 26
+        events.append({"t": t, "ws": bytes([hid_app.WS_KEY_DOWN, keycode]).hex()})
+        events.append({"t": t + 0.06, "ws": bytes([hid_app.WS_KEY_UP, keycode]).hex()})
+    for i in range(int(seconds)):
+        events.append({"t": i + 0.5, "http": "/type", "json": {"text": "setup_var 0x10 0x1\n"}})
+        events.append({"t": i + 0.7, "http": "/mouse_abs", "json": {"x": 0.5, "y": 0.5, "buttons": 0}})
+        events.append({"t": i + 0.9, "http": "/keyboard", "json": {"keycodes": [17, 67]}})
+    return sorted(events, key=lambda e: e["t"])
+
+
+def load_recording(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay(events, client, speed=1.0):
+    start = time.monotonic()
+    for event in events:
+        delay = start + event["t"] / speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if "ws" in event:
+            hid_app.handle_ws_frame(bytes.fromhex(event["ws"]))
+        else:
+            client.post(event["http"], json=event.get("json"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recording", nargs="?")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    events = load_recording(args.recording) if args.recording else synthetic_session()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stop = threading.Event()
+        paths = {}
+        for name in hid_app.hid.paths:
+            paths[name] = os.path.join(tmp, name)
+            os.mkfifo(paths[name])
+            drain_forever(paths[name], stop)
+        hid_app.hid.paths = paths     # fds are opened lazily, on the first write
+
+        client = hid_app.app.test_client()
+        client.get("/metrics/hid?reset=1")
+        for _ in range(args.repeat):
+            replay(events, client, args.speed)
+        hid_app.mouse_coalescer.flush()
+        hid_app.hid.wait_idle(timeout=30)
+        report = client.get("/metrics/hid").get_json()
+        stop.set()
+
+    print(f"{len(events) * args.repeat} events replayed, {report.pop('dropped')} report(s) dropped")
+    print(f"{'stage':<8}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage in STAGES:
+        s = report[stage]
+        print(f"{stage:<8}{s['count']:>8}{s['p50_ms'] or 0:>10.3f}{s['p95_ms'] or 0:>10.3f}"
+              f"{s['p99_ms'] or 0:>10.3f}{s['max_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import ctypes
+import ctypes.util
+import os
+import re
+import struct
+import threading
+import time
+
+# -----------------------------
+# USB capture device discovery
+# -----------------------------
+# Builds the same USB-path -> /dev/videoN map that `v4l2-ctl --list-devices`
+# prints, straight from /sys/class/video4linux. The map is cached and rebuilt
+# only when a video node appears or disappears in /dev (inotify), so a
+# re-plugged capture dongle is picked up without restarting the service.
+#
+# Both roots are parameters so the discovery can run against a fake tree.
+
+SYSFS_VIDEO = "/sys/class/video4linux"
+DEV_ROOT = "/dev"
+FIRST_HUB_PORT = "usb-0000:01:00.0-1.1.1"
+
+_USB_BUS_RE = re.compile(r"^usb\d+$")
+_USB_DEV_RE = re.compile(r"^\d+-([\d.]+)$")   # e.g. 1-1.1.1 -> devpath 1.1.1
+_VIDEO_RE = re.compile(r"^video(\d+)$")
+
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def usb_bus_info(device_path):
+    """Derive v4l2's bus_info ("usb-<controller>-<devpath>") from a sysfs path"""
+    parts = device_path.split(os.sep)
+    controller = devpath = None
+    for i, part in enumerate(parts):
+        if _USB_BUS_RE.match(part) and i > 0:
+            controller = parts[i - 1]
+        match = _USB_DEV_RE.match(part)
+        if match and controller:
+            devpath = match.group(1)   # deepest USB device wins
+    if controller and devpath:
+        return f"usb-{controller}-{devpath}"
+    return None
+
+
+def scan(sysfs_root=SYSFS_VIDEO, dev_root=DEV_ROOT):
+    """Return {usb_path: "/dev/videoN"} using the lowest node per device"""
+    mapping = {}
+    try:
+        entries = os.listdir(sysfs_root)
+    except OSError:
+        return mapping
+    for name in entries:
+        match = _VIDEO_RE.match(name)
+        if not match:
+            continue
+        device_path = os.path.realpath(os.path.join(sysfs_root, name, "device"))
+        bus_info = usb_bus_info(device_path)
+        if not bus_info:
+            continue  # not a USB device (e.g. the Pi's ISP / codec nodes)
+        index = int(match.group(1))
+        current = mapping.get(bus_info)
+        if current is None or index < current:
+            mapping[bus_info] = index
+    return {bus: os.path.join(dev_root, f"video{index}") for bus, index in sorted(mapping.items())}
+
+
+def primary_path(mapping, port=FIRST_HUB_PORT):
+    """USB path of the main capture: the first hub port, else the lowest /dev/videoN"""
+    if port in mapping:
+        return port
+    if not mapping:
+        return None
+    return min(mapping, key=lambda usb_path: _device_index(mapping[usb_path]))
+
+
+def _device_index(device):
+    match = _VIDEO_RE.match(os.path.basename(device))
+    return int(match.group(1)) if match else float("inf")
+
+
+class CaptureDevices:
+    """Cached capture-device map, refreshed on /dev hotplug events"""
+
+    def __init__(self, sysfs_root=SYSFS_VIDEO, dev_root=DEV_ROOT, settle=0.5):
+        self.sysfs_root = sysfs_root
+        self.dev_root = dev_root
+        self.settle = settle          # seconds to let udev finish a burst of events
+        self._lock = threading.Lock()
+        self._mapping = None
+        self._listeners = []
+        self._thread = None
+
+    def mapping(self):
+        with self._lock:
+            if self._mapping is None:
+                self._mapping = scan(self.sysfs_root, self.dev_root)
+            return dict(self._mapping)
+
+    def refresh(self):
+        new = scan(self.sysfs_root, self.dev_root)
+        with self._lock:
+            changed = new != self._mapping
+            self._mapping = new
+        if changed:
+            print(f"[*] Capture devices: {new}")
+            for callback in list(self._listeners):
+                try:
+                    callback(dict(new))
+                except Exception as e:
+                    print("[!] Capture listener error:", e)
+        return dict(new)
+
+    def on_change(self, callback):
+        self._listeners.append(callback)
+
+    def primary(self, port=FIRST_HUB_PORT):
+        """Device on the first hub port, or any capture device if none there"""
+        mapping = self.mapping()
+        usb_path = primary_path(mapping, port)
+        return mapping[usb_path] if usb_path else None
+
+    def watch(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch, name="capture-watch", daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        fd = _inotify_watch(self.dev_root)
+        if fd is None:
+            print("[!] inotify unavailable, polling for capture devices")
+            while True:
+                time.sleep(5)
+                self.refresh()
+        while True:
+            data = os.read(fd, 4096)
+            if any(_VIDEO_RE.match(name) for name in _event_names(data)):
+                time.sleep(self.settle)
+                _drain(fd)
+                self.refresh()
+
+
+def _inotify_watch(path):
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return None
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    fd = libc.inotify_init1(0)
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(path), IN_CREATE | IN_DELETE) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _event_names(data):
+    offset = 0
+    while offset + _EVENT_HEADER.size <= len(data):
+        _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+        offset += _EVENT_HEADER.size
+        yield data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+        offset += length
+
+
+def _drain(fd):
+    os.set_blocking(fd, False)
+    try:
+        while os.read(fd, 4096):
+            pass
+    except BlockingIOError:
+        pass
+    finally:
+        os.set_blocking(fd, True)
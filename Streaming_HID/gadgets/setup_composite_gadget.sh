@@ -48,6 +48,12 @@ echo 2 > functions/hid.usb1/protocol
 echo 1 > functions/hid.usb1/subclass
 echo 3 > functions/hid.usb1/report_length
 echo -ne '\x05\x01\x09\x02\xa1\x01\x09\x01\xa1\x00\x05\x09\x19\x01\x29\x03\x15\x00\x25\x01\x95\x03\x75\x01\x81\x02\x95\x01\x75\x05\x81\x01\x05\x01\x09\x30\x09\x31\x15\x81\x25\x7f\x75\x08\x95\x02\x81\x06\xc0\xc0' > functions/hid.usb1/report_desc
+# HID Absolute Mouse (tablet): buttons, then 16-bit X/Y in 0..32767
+mkdir -p functions/hid.usb2
+echo 0 > functions/hid.usb2/protocol
+echo 0 > functions/hid.usb2/subclass
+echo 5 > functions/hid.usb2/report_length
+echo -ne '\x05\x01\x09\x02\xa1\x01\x09\x01\xa1\x00\x05\x09\x19\x01\x29\x03\x15\x00\x25\x01\x95\x03\x75\x01\x81\x02\x95\x01\x75\x05\x81\x01\x05\x01\x09\x30\x09\x31\x16\x00\x00\x26\xff\x7f\x75\x10\x95\x02\x81\x02\xc0\xc0' > functions/hid.usb2/report_desc
 # Mass Storage (no ISO yet)
 mkdir -p functions/mass_storage.usb0
 echo 1 > functions/mass_storage.usb0/stall
@@ -58,6 +64,7 @@ echo "" > functions/mass_storage.usb0/lun.0/file  # Empty for now
 # Link functions
 ln -s functions/hid.usb0 configs/c.1/
 ln -s functions/hid.usb1 configs/c.1/
+ln -s functions/hid.usb2 configs/c.1/
 ln -s functions/mass_storage.usb0 configs/c.1/
 
 # Bind
@@ -0,0 +1,86 @@
+import threading
+
+# -----------------------------
+# Stateful boot-keyboard model
+# -----------------------------
+# Tracks what the host should currently see as held: the modifier byte plus
+# up to six pressed usages. Down/up events update the state and a report is
+# emitted only when it actually changes, so held keys, chords built over
+# several events and host-side key repeat behave like a real keyboard.
+# Taps (shortcuts, one-shot chords) go through here as well: they are
+# pressed on top of the held keys and released back to them, so a held
+# Shift survives a shortcut click.
+
+MAX_ROLLOVER = 6
+
+
+class KeyboardState:
+    """Held-key state for one keyboard gadget.
+
+    `emit(report)` writes a report; `emit_timed([(report, hold), ...])`
+    writes a timed sequence in one piece (used by tap()).
+    """
+
+    def __init__(self, emit, emit_timed=None):
+        self.emit = emit
+        self.emit_timed = emit_timed
+        self.modifier = 0x00
+        self.keys = []
+        self._lock = threading.Lock()
+
+    def report(self):
+        return bytes([self.modifier, 0x00] + self.keys + [0] * (MAX_ROLLOVER - len(self.keys)))
+
+    def down(self, usage):
+        """Press a HID usage; returns True if a report was sent"""
+        with self._lock:
+            if 0xE0 <= usage <= 0xE7:
+                bit = 1 << (usage - 0xE0)
+                if self.modifier & bit:
+                    return False
+                self.modifier |= bit
+            else:
+                # Repeats of a held key and keys past 6KRO change nothing
+                if not usage or usage in self.keys or len(self.keys) >= MAX_ROLLOVER:
+                    return False
+                self.keys.append(usage)
+            self.emit(self.report())
+            return True
+
+    def up(self, usage):
+        """Release a HID usage; returns True if a report was sent"""
+        with self._lock:
+            if 0xE0 <= usage <= 0xE7:
+                bit = 1 << (usage - 0xE0)
+                if not self.modifier & bit:
+                    return False
+                self.modifier &= ~bit
+            else:
+                if usage not in self.keys:
+                    return False
+                self.keys.remove(usage)
+            self.emit(self.report())
+            return True
+
+    def tap(self, usages, hold, modifier=0x00):
+        """Press `usages` (plus `modifier` bits) over the held keys for `hold`
+        seconds, then return to the held state; returns the emit result"""
+        with self._lock:
+            keys = list(self.keys)
+            for usage in usages:
+                if 0xE0 <= usage <= 0xE7:
+                    modifier |= 1 << (usage - 0xE0)
+                elif usage and usage not in keys and len(keys) < MAX_ROLLOVER:
+                    keys.append(usage)
+            pressed = bytes([self.modifier | modifier, 0x00] + keys + [0] * (MAX_ROLLOVER - len(keys)))
+            return self.emit_timed([(pressed, hold), (self.report(), 0.0)])
+
+    def release_all(self):
+        """Drop every held key, e.g. when the browser loses focus"""
+        with self._lock:
+            if not self.modifier and not self.keys:
+                return False
+            self.modifier = 0x00
+            self.keys = []
+            self.emit(self.report())
+            return True
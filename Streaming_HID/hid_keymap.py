@@ -0,0 +1,86 @@
+# -----------------------------
+# ASCII -> HID usage table (US layout)
+# -----------------------------
+# Built once at import: for every printable ASCII character the
+# (modifier, usage) pair and the ready-made 8-byte press report, so typing a
+# string is a table lookup per character with no per-call branching.
+
+MOD_LEFT_SHIFT = 0x02
+KEY_RELEASE = bytes(8)
+
+_UNSHIFTED = {
+    " ": 0x2C, "\n": 0x28, "\t": 0x2B,
+    "-": 0x2D, "=": 0x2E, "[": 0x2F, "]": 0x30, "\\": 0x31,
+    ";": 0x33, "'": 0x34, "`": 0x35, ",": 0x36, ".": 0x37, "/": 0x38,
+    "1": 0x1E, "2": 0x1F, "3": 0x20, "4": 0x21, "5": 0x22,
+    "6": 0x23, "7": 0x24, "8": 0x25, "9": 0x26, "0": 0x27,
+}
+
+_SHIFTED = {
+    "!": 0x1E, "@": 0x1F, "#": 0x20, "$": 0x21, "%": 0x22,
+    "^": 0x23, "&": 0x24, "*": 0x25, "(": 0x26, ")": 0x27,
+    "_": 0x2D, "+": 0x2E, "{": 0x2F, "}": 0x30, "|": 0x31,
+    ":": 0x33, '"': 0x34, "~": 0x35, "<": 0x36, ">": 0x37, "?": 0x38,
+}
+
+
+def _build_table():
+    table = {}
+    for i in range(26):
+        table[chr(ord("a") + i)] = (0x00, 0x04 + i)
+        table[chr(ord("A") + i)] = (MOD_LEFT_SHIFT, 0x04 + i)
+    for ch, usage in _UNSHIFTED.items():
+        table[ch] = (0x00, usage)
+    for ch, usage in _SHIFTED.items():
+        table[ch] = (MOD_LEFT_SHIFT, usage)
+    return table
+
+
+ASCII_TO_HID = _build_table()
+ASCII_REPORTS = {ch: bytes([mod, 0x00, usage, 0, 0, 0, 0, 0]) for ch, (mod, usage) in ASCII_TO_HID.items()}
+
+
+# Named keys for macros and scripted input
+KEY_NAMES = {
+    **{chr(ord("a") + i): 0x04 + i for i in range(26)},
+    **{str(d): 0x1E + (d - 1) for d in range(1, 10)}, "0": 0x27,
+    **{f"f{i}": 0x3A + (i - 1) for i in range(1, 13)},
+    "enter": 0x28, "esc": 0x29, "backspace": 0x2A, "tab": 0x2B, "space": 0x2C,
+    "minus": 0x2D, "equal": 0x2E, "capslock": 0x39,
+    "printscreen": 0x46, "scrolllock": 0x47, "pause": 0x48,
+    "insert": 0x49, "home": 0x4A, "pageup": 0x4B, "delete": 0x4C,
+    "end": 0x4D, "pagedown": 0x4E,
+    "right": 0x4F, "left": 0x50, "down": 0x51, "up": 0x52,
+    "ctrl": 0xE0, "shift": 0xE1, "alt": 0xE2, "win": 0xE3,
+    "rctrl": 0xE4, "rshift": 0xE5, "ralt": 0xE6, "rwin": 0xE7,
+}
+
+
+def chord_report(usages):
+    """8-byte report with modifiers folded into byte 0 and up to 6 keys"""
+    modifier = 0x00
+    keys = []
+    for usage in usages:
+        if 0xE0 <= usage <= 0xE7:
+            modifier |= 1 << (usage - 0xE0)
+        elif len(keys) < 6:
+            keys.append(usage)
+    return bytes([modifier, 0x00] + keys + [0] * (6 - len(keys)))
+
+
+def compile_text(text):
+    """Turn a string into a flat list of press/release keyboard reports.
+
+    Returns (reports, skipped) where `skipped` lists characters with no
+    mapping. "\\r\\n" and lone "\\r" are typed as a single Enter.
+    """
+    reports = []
+    skipped = []
+    for ch in text.replace("\r\n", "\n").replace("\r", "\n"):
+        press = ASCII_REPORTS.get(ch)
+        if press is None:
+            skipped.append(ch)
+            continue
+        reports.append(press)
+        reports.append(KEY_RELEASE)
+    return reports, skipped
@@ -0,0 +1,173 @@
+import json
+import math
+import os
+import re
+
+from hid_keymap import KEY_NAMES, KEY_RELEASE, chord_report, compile_text
+
+# -----------------------------
+# HID macros
+# -----------------------------
+# A macro is a JSON file in MACRO_DIR:
+#
+#   {"description": "...", "steps": [ ... ]}
+#
+# Steps:
+#   {"keys": ["ctrl", "alt", "delete"], "hold_ms": 50}    tap a chord
+#   {"delay_ms": 500}                                      wait
+#   {"type": "fs0:\n", "gap_ms": 4}                        type text
+#   {"repeat": 4, "steps": [ ... ]}                        repeat a block
+#   {"key": "f2", "every_ms": 100, "for_ms": 15000}        tap a key on a fixed period
+#
+# Macros are compiled to (report, hold) pairs and handed to the HidWriter in
+# one piece, so all timing runs on the Pi's monotonic clock instead of over
+# the network.
+
+MACRO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "macros")
+DEFAULT_HOLD_MS = 50
+DEFAULT_GAP_MS = 4
+MAX_MACRO_REPORTS = 50000
+MAX_REPEAT = 10000
+MAX_STEP_MS = 10 * 60 * 1000    # longest delay, hold, gap or period in one step
+MAX_MACRO_SECONDS = 60 * 60     # whole-macro running time
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class MacroError(ValueError):
+    pass
+
+
+def _usage(name):
+    usage = KEY_NAMES.get(str(name).lower())
+    if usage is None:
+        raise MacroError(f"unknown key '{name}'")
+    return usage
+
+
+def _ms(step, key, default):
+    try:
+        value = float(step.get(key, default))
+    except (TypeError, ValueError):
+        raise MacroError(f"{key} must be a number") from None
+    # inf would schedule a report forever away; NaN compares false to everything
+    if not math.isfinite(value) or not 0 <= value <= MAX_STEP_MS:
+        raise MacroError(f"{key} must be between 0 and {MAX_STEP_MS}")
+    return value / 1000
+
+
+def _wait(out, seconds):
+    # A delay stretches the hold of whatever report went out last
+    if out:
+        report, hold = out[-1]
+        out[-1] = (report, hold + seconds)
+    else:
+        out.append((KEY_RELEASE, seconds))
+
+
+def _tap(out, report, hold):
+    out.append((report, hold))
+    out.append((KEY_RELEASE, 0.0))
+
+
+def _reserve(out, count):
+    # Checked before expanding, so a huge repeat or period fails at once
+    if len(out) + count > MAX_MACRO_REPORTS:
+        raise MacroError(f"macro exceeds {MAX_MACRO_REPORTS} reports")
+
+
+def _compile(steps, out):
+    if not isinstance(steps, list):
+        raise MacroError("steps must be a list")
+    for step in steps:
+        if not isinstance(step, dict):
+            raise MacroError(f"bad step {step!r}")
+        if "repeat" in step:
+            repeat = int(step["repeat"])
+            if not 0 <= repeat <= MAX_REPEAT:
+                raise MacroError(f"repeat must be between 0 and {MAX_REPEAT}")
+            # Compile the block once and copy it, so the work is bounded by
+            # the reports produced, not by the repeat count
+            block = []
+            _compile(step.get("steps", []), block)
+            if len(block) == 1 and block[0][0] == KEY_RELEASE:
+                # A block that only waits stretches the previous report
+                _wait(out, block[0][1] * repeat)
+                continue
+            _reserve(out, len(block) * repeat)
+            for _ in range(repeat):
+                out.extend(block)
+        elif "every_ms" in step:
+            report = chord_report([_usage(step["key"])])
+            period = _ms(step, "every_ms", 0)
+            if period <= 0:
+                raise MacroError("every_ms must be positive")
+            hold = min(_ms(step, "hold_ms", DEFAULT_HOLD_MS), period / 2)
+            taps = int(_ms(step, "for_ms", 0) / period + 1e-9)
+            _reserve(out, 2 * taps)
+            for _ in range(taps):
+                out.append((report, hold))
+                out.append((KEY_RELEASE, period - hold))
+        elif "keys" in step:
+            _tap(out, chord_report([_usage(k) for k in step["keys"]]), _ms(step, "hold_ms", DEFAULT_HOLD_MS))
+        elif "key" in step:
+            _tap(out, chord_report([_usage(step["key"])]), _ms(step, "hold_ms", DEFAULT_HOLD_MS))
+        elif "type" in step:
+            reports, skipped = compile_text(str(step["type"]))
+            if skipped:
+                raise MacroError(f"cannot type {''.join(skipped)!r}")
+            gap = _ms(step, "gap_ms", DEFAULT_GAP_MS)
+            _reserve(out, len(reports))
+            out.extend((report, gap) for report in reports)
+        elif "delay_ms" in step:
+            _wait(out, _ms(step, "delay_ms", 0))
+        else:
+            raise MacroError(f"bad step {step!r}")
+        if len(out) > MAX_MACRO_REPORTS:
+            raise MacroError(f"macro exceeds {MAX_MACRO_REPORTS} reports")
+
+
+def compile_macro(macro):
+    """Compile a macro dict to a list of (report, hold_seconds) pairs"""
+    out = []
+    _compile(macro.get("steps", []), out)
+    if sum(hold for _, hold in out) > MAX_MACRO_SECONDS:
+        raise MacroError(f"macro runs longer than {MAX_MACRO_SECONDS} s")
+    return out
+
+
+def macro_path(name):
+    if not _NAME_RE.match(name):
+        raise MacroError("invalid macro name")
+    return os.path.join(MACRO_DIR, f"{name}.json")
+
+
+def load_macro(name):
+    with open(macro_path(name)) as f:
+        return json.load(f)
+
+
+def save_macro(name, macro):
+    compile_macro(macro)  # reject bad macros before they reach disk
+    os.makedirs(MACRO_DIR, exist_ok=True)
+    path = macro_path(name)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(macro, f, indent=2)
+    os.replace(tmp, path)
+
+
+def list_macros():
+    if not os.path.isdir(MACRO_DIR):
+        return []
+    macros = []
+    for filename in sorted(os.listdir(MACRO_DIR)):
+        if not filename.endswith(".json"):
+            continue
+        name = filename[:-5]
+        try:
+            description = load_macro(name).get("description", "")
+        except (OSError, ValueError):
+            description = "(unreadable)"
+        macros.append({"name": name, "description": description})
+    return macros
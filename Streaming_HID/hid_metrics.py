@@ -0,0 +1,147 @@
+import math
+import threading
+import time
+import weakref
+
+# -----------------------------
+# HID input latency histograms
+# -----------------------------
+# Log-scale histograms (4 buckets per power of two, 1 us .. ~100 s) for each
+# stage an input event goes through:
+#
+#   build   request receipt -> report queued (Flask/JSON/WebSocket + build)
+#   queue   report queued   -> gadget write starts (writer thread backlog)
+#   write   os.write() on /dev/hidgN
+#   total   request receipt -> first report written
+#
+# Each thread records into its own shard, so the hot path takes no lock.
+# When a thread exits its shard is folded into one "retired" shard, so the
+# per-connection threads of the dev server don't leave shards behind;
+# readers merge the shards when a snapshot is requested.
+
+BUCKETS_PER_OCTAVE = 4
+NUM_BUCKETS = 27 * BUCKETS_PER_OCTAVE
+STAGES = ("build", "queue", "write", "total")
+
+
+def _bucket(seconds):
+    us = seconds * 1e6
+    if us <= 1:
+        return 0
+    return min(NUM_BUCKETS - 1, int(math.log2(us) * BUCKETS_PER_OCTAVE))
+
+
+def _bucket_upper_ms(index):
+    return 2 ** ((index + 1) / BUCKETS_PER_OCTAVE) / 1000
+
+
+class _Shard:
+    __slots__ = ("counts", "max")
+
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.max = 0.0
+
+
+class _Owner:
+    """Held in a thread's local storage; collected when the thread exits"""
+
+
+class Histogram:
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()      # totals of threads that have exited
+        self._register = threading.Lock()
+
+    def _shard(self):
+        shard = _Shard()
+        owner = _Owner()
+        # Fires when the thread ends and its local storage is dropped
+        weakref.finalize(owner, self._retire, shard)
+        with self._register:
+            self._shards.append(shard)
+        self._local.owner = owner
+        self._local.shard = shard
+        return shard
+
+    def _retire(self, shard):
+        with self._register:
+            retired = self._retired
+            for i, c in enumerate(shard.counts):
+                retired.counts[i] += c
+            retired.max = max(retired.max, shard.max)
+            self._shards.remove(shard)
+
+    def record(self, seconds):
+        # Only this thread writes its shard, so recording takes no lock
+        shard = getattr(self._local, "shard", None) or self._shard()
+        shard.counts[_bucket(seconds)] += 1
+        if seconds > shard.max:
+            shard.max = seconds
+
+    def reset(self):
+        with self._register:
+            for shard in self._shards + [self._retired]:
+                shard.counts = [0] * NUM_BUCKETS
+                shard.max = 0.0
+
+    def summary(self):
+        with self._register:
+            # A shard retiring after this is still read below, and only once
+            counts = list(self._retired.counts)
+            worst = self._retired.max
+            shards = list(self._shards)
+        for shard in shards:
+            for i, c in enumerate(list(shard.counts)):
+                counts[i] += c
+            worst = max(worst, shard.max)
+        total = sum(counts)
+        result = {"count": total}
+        max_ms = round(worst * 1000, 3)
+        for name, q in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            value = _percentile(counts, total, q)
+            # bucket upper bounds overshoot; never report above the worst sample
+            result[name] = None if value is None else min(value, max_ms)
+        result["max_ms"] = max_ms
+        return result
+
+
+def _percentile(counts, total, q):
+    if not total:
+        return None
+    rank = math.ceil(total * q)
+    seen = 0
+    for i, c in enumerate(counts):
+        seen += c
+        if seen >= rank:
+            return round(_bucket_upper_ms(i), 3)
+    return None
+
+
+class HidMetrics:
+    """Per-stage histograms plus the 'request receipt' origin of the current thread"""
+
+    def __init__(self):
+        self.stages = {name: Histogram() for name in STAGES}
+        self._origin = threading.local()
+
+    def begin(self):
+        """Mark request receipt on this thread"""
+        self._origin.t = time.monotonic()
+
+    def end(self):
+        self._origin.t = None
+
+    def origin(self):
+        return getattr(self._origin, "t", None)
+
+    def record(self, stage, seconds):
+        self.stages[stage].record(seconds)
+
+    def reset(self):
+        for hist in self.stages.values():
+            hist.reset()
+
+    def report(self):
+        return {name: hist.summary() for name, hist in self.stages.items()}
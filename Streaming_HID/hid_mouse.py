@@ -0,0 +1,112 @@
+import struct
+import threading
+import time
+
+# -----------------------------
+# Relative mouse coalescing
+# -----------------------------
+# The boot-protocol mouse report carries one signed byte per axis, so deltas
+# are accumulated here and flushed no faster than the host drains the
+# endpoint. Oversized totals are split into in-range reports instead of being
+# wrapped with `& 0xFF`.
+
+MOUSE_DELTA_LIMIT = 127
+MOUSE_POLL_INTERVAL = 0.008  # seconds between flushed reports
+MOUSE_MOVE_MAX = 0x7FFF      # largest movement per axis, the int16 range of /ws/hid
+
+# Absolute (tablet) pointer on hid.usb2: buttons, X, Y with 0..ABS_AXIS_MAX axes
+ABS_AXIS_MAX = 32767
+ABS_REPORT = struct.Struct("<BHH")
+
+
+def split_delta(dx, dy, limit=MOUSE_DELTA_LIMIT):
+    """Split a movement into steps that each fit in a signed report byte.
+
+    Both axes advance proportionally so the cursor follows a straight line,
+    and the steps always sum to exactly (dx, dy).
+    """
+    steps = max(1, -(-abs(dx) // limit), -(-abs(dy) // limit))
+    out = []
+    prev_x = prev_y = 0
+    for i in range(1, steps + 1):
+        # int() truncates toward zero, keeping each step within the limit
+        cur_x = int(dx * i / steps)
+        cur_y = int(dy * i / steps)
+        out.append((cur_x - prev_x, cur_y - prev_y))
+        prev_x, prev_y = cur_x, cur_y
+    return out
+
+
+def clamp_move(value):
+    """Limit a relative movement to the int16 range, so splitting it stays cheap"""
+    return min(max(int(value), -MOUSE_MOVE_MAX - 1), MOUSE_MOVE_MAX)
+
+
+def absolute_report(x, y, buttons):
+    """Build an absolute pointer report; x/y are in 0..ABS_AXIS_MAX"""
+    x = min(max(int(x), 0), ABS_AXIS_MAX)
+    y = min(max(int(y), 0), ABS_AXIS_MAX)
+    return ABS_REPORT.pack(buttons & 0x07, x, y)
+
+
+class MouseCoalescer:
+    """Accumulate relative moves and flush them once per poll interval.
+
+    `emit(dx, dy, buttons, origin)` is called from the flush thread (or
+    inline for button changes) with the summed movement; it is expected to
+    split and write the reports. `origin` is the receipt time passed to
+    move() for the earliest movement in the batch, so latency is measured
+    from the oldest input the report carries.
+    """
+
+    def __init__(self, emit, interval=MOUSE_POLL_INTERVAL):
+        self.emit = emit
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._dx = 0
+        self._dy = 0
+        self._buttons = 0
+        self._origin = None
+        self._last_flush = 0.0
+        self._thread = threading.Thread(target=self._run, name="mouse-coalescer", daemon=True)
+        self._thread.start()
+
+    def move(self, dx, dy, buttons, origin=None):
+        with self._cond:
+            if buttons != self._buttons:
+                # Button edges go out at once, after any movement made before them
+                self._flush_locked()
+                self._buttons = buttons
+                self.emit(0, 0, buttons, origin)
+                self._last_flush = time.monotonic()
+            if dx or dy:
+                if not (self._dx or self._dy):
+                    self._origin = origin
+                # A backlog of moves can't add up to more than one move may carry
+                self._dx = clamp_move(self._dx + dx)
+                self._dy = clamp_move(self._dy + dy)
+                self._cond.notify()
+
+    def flush(self):
+        with self._cond:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._dx or self._dy:
+            dx, dy, origin = self._dx, self._dy, self._origin
+            self._dx = self._dy = 0
+            self._origin = None
+            self.emit(dx, dy, self._buttons, origin)
+            self._last_flush = time.monotonic()
+
+    def _run(self):
+        with self._cond:
+            while True:
+                self._cond.wait_for(lambda: self._dx or self._dy)
+                # Keep collecting until the next poll slot; new moves only add up
+                deadline = self._last_flush + self.interval
+                delay = deadline - time.monotonic()
+                while delay > 0:
+                    self._cond.wait(delay)
+                    delay = deadline - time.monotonic()
+                self._flush_locked()
@@ -0,0 +1,252 @@
+import heapq
+import itertools
+import math
+import os
+import queue
+import threading
+import time
+
+# -----------------------------
+# Persistent HID gadget writer
+# -----------------------------
+# Keeps every /dev/hidgN open for the life of the process and funnels all
+# reports through one writer thread. Request threads only enqueue; press and
+# release timing is scheduled on the monotonic clock by the writer, so Flask
+# workers never sleep and never open() the gadget themselves.
+#
+# Gadgets are opened non-blocking: f_hidg holds a second write until the
+# host has read the first, and firmware often polls only the boot keyboard
+# and mouse. A device whose write would block is retried with its own
+# backoff while the other devices carry on; once it has been stalled for
+# STALL_DROP seconds its backlog is dropped, and so is each new report the
+# host still won't take, until a write goes through again.
+#
+# With a HidMetrics attached, the first report of every submission carries
+# its request-receipt and enqueue times so the writer can record queueing,
+# write and end-to-end latency.
+
+DEFAULT_QUEUE_SIZE = 512
+BACKOFF_MIN = 0.002       # first retry delay for a device the host isn't reading
+BACKOFF_MAX = 0.1
+STALL_DROP = 1.0          # seconds stalled before that device's reports are dropped
+MAX_WAIT = 1.0            # longest the writer sleeps before re-checking the schedule
+
+
+class HidWriter:
+    """Single-threaded writer for a set of named HID gadget devices"""
+
+    def __init__(self, paths, maxsize=DEFAULT_QUEUE_SIZE, metrics=None):
+        self.paths = dict(paths)          # name -> device path
+        self.metrics = metrics
+        self._fds = {}                    # name -> open file descriptor
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._pending = []                # heap of (due, seq, name, report, stamps)
+        self._tail = {}                   # name -> earliest time the next report may go out
+        self._seq = itertools.count()
+        self._stalls = {}                 # name -> [since, backoff, retry at, dropped]
+        self._idle = threading.Condition()
+        self._inflight = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self.dropped = 0
+
+    # ---- public API (safe to call from any thread) ----
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hid-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        self._stop.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        for name in list(self._fds):
+            self._close(name)
+
+    def submit(self, name, report, hold=0.0):
+        """Queue a report for device `name`.
+
+        `hold` is the minimum time in seconds before the next report on the
+        same device may be written (e.g. how long a key stays pressed).
+        Reports for one device always go out in submission order.
+        Returns False if the queue is full and the report was dropped.
+        """
+        return self.submit_many(name, (report,), hold)
+
+    def submit_many(self, name, reports, gap=0.0, origin=None):
+        """Queue a burst of reports as one queue entry, `gap` seconds apart"""
+        return self.submit_timed(name, [(report, gap) for report in reports], origin)
+
+    def submit_timed(self, name, items, origin=None):
+        """Queue (report, hold) pairs as one entry; each hold delays the next report.
+
+        `origin` is the receipt time of the input behind the reports, for
+        callers off the request thread; by default it's the current request's.
+        """
+        items = tuple((bytes(report), hold) for report, hold in items)
+        if not items:
+            return True
+        if not all(math.isfinite(hold) and hold >= 0 for _, hold in items):
+            # inf would park the device forever; NaN breaks the heap's ordering
+            raise ValueError("hold must be a finite, non-negative number of seconds")
+        stamps = None
+        if self.metrics is not None:
+            queued = time.monotonic()
+            if origin is None:
+                origin = self.metrics.origin()
+            if origin is not None:
+                self.metrics.record("build", queued - origin)
+            stamps = (origin, queued)
+        with self._idle:
+            self._inflight += len(items)
+        try:
+            self._queue.put_nowait((name, items, stamps))
+        except queue.Full:
+            self._done(len(items))
+            self.dropped += len(items)
+            print(f"[!] HID queue full, dropped {len(items)} {name} report(s)")
+            return False
+        return True
+
+    def cancel(self, name):
+        """Drop every report still waiting for device `name`"""
+        # Processed on the writer thread, which owns the schedule
+        self._queue.put((name, None, None))
+
+    def stalled(self):
+        """Devices whose reports are being dropped because the host isn't reading them"""
+        return sorted(name for name, stall in list(self._stalls.items()) if stall[3])
+
+    def wait_idle(self, timeout=None):
+        """Block until every submitted report has been written or dropped"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._inflight == 0, timeout)
+
+    # ---- writer thread ----
+
+    def _run(self):
+        while not self._stop.is_set():
+            timeout = None
+            if self._pending:
+                timeout = min(MAX_WAIT, max(0.0, self._pending[0][0] - time.monotonic()))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            while item is not None:
+                self._schedule(*item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            now = time.monotonic()
+            while self._pending and self._pending[0][0] <= now:
+                entry = heapq.heappop(self._pending)
+                name = entry[2]
+                stall = self._stalls.get(name)
+                dropping = stall is not None and stall[3] > 0
+                if stall is None or dropping or now >= stall[2]:
+                    if self._write(name, entry[3], entry[4]):
+                        self._unstall(name)
+                        self._done(1)
+                        continue
+                    stall = self._stall(name, now)
+                if dropping or now - stall[0] >= STALL_DROP:
+                    if not dropping:
+                        print(f"[!] Host is not reading {name}, dropping its reports")
+                        purged = self._cancel(name)
+                        stall[3] += purged
+                        self.dropped += purged
+                    stall[3] += 1
+                    self.dropped += 1
+                    self._done(1)
+                else:
+                    # Keeps its seq, so the device's reports stay in order
+                    heapq.heappush(self._pending, (stall[2],) + entry[1:])
+
+    def _schedule(self, name, items, stamps):
+        if items is None:
+            self._cancel(name)
+            return
+        now = time.monotonic()
+        due = max(now, self._tail.get(name, now))
+        for report, hold in items:
+            heapq.heappush(self._pending, (due, next(self._seq), name, report, stamps))
+            stamps = None             # only the first report of an entry is timed
+            due += hold
+        self._tail[name] = due
+
+    def _cancel(self, name):
+        kept = [entry for entry in self._pending if entry[2] != name]
+        dropped = len(self._pending) - len(kept)
+        heapq.heapify(kept)
+        self._pending = kept
+        self._tail.pop(name, None)
+        if dropped:
+            self._done(dropped)
+        return dropped
+
+    def _stall(self, name, now):
+        stall = self._stalls.get(name)
+        if stall is None:
+            stall = self._stalls[name] = [now, BACKOFF_MIN, 0.0, 0]
+        else:
+            stall[1] = min(stall[1] * 2, BACKOFF_MAX)
+        stall[2] = now + stall[1]
+        return stall
+
+    def _unstall(self, name):
+        stall = self._stalls.pop(name, None)
+        if stall is not None and stall[3]:
+            print(f"[*] Host reading {name} again, {stall[3]} report(s) dropped")
+
+    def _done(self, count):
+        with self._idle:
+            self._inflight -= count
+            if self._inflight <= 0:
+                self._inflight = 0
+                self._idle.notify_all()
+
+    def _write(self, name, report, stamps=None):
+        """Write one report; False if the host hasn't read the previous one yet"""
+        fd = self._fds.get(name)
+        try:
+            if fd is None:
+                fd = os.open(self.paths[name], os.O_WRONLY | os.O_NONBLOCK)
+                self._fds[name] = fd
+            if self.metrics is None:
+                os.write(fd, report)
+                return True
+            start = time.monotonic()
+            os.write(fd, report)
+            end = time.monotonic()
+            self.metrics.record("write", end - start)
+            if stamps is not None:
+                origin, queued = stamps
+                self.metrics.record("queue", start - queued)
+                if origin is not None:
+                    self.metrics.record("total", end - origin)
+        except BlockingIOError:
+            return False
+        except (OSError, KeyError) as e:
+            # Gadget unbound or host gone: drop the handle, reopen on next report
+            print(f"[!] HID write error on {name}: {e}")
+            self._close(name)
+        return True
+
+    def _close(self, name):
+        fd = self._fds.pop(name, None)
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
@@ -0,0 +1,146 @@
+import io
+import threading
+import time
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # screen waits need both; the rest of the app does not
+    np = None
+    Image = None
+
+# -----------------------------
+# Screen-change detection
+# -----------------------------
+# Frames from a FrameGrabber are decoded at reduced resolution (libjpeg draft
+# mode, grayscale) and compared block by block with NumPy. Automation can
+# wait for the DUT screen to stop changing instead of sleeping for the worst
+# case, and ask which regions changed since a saved mark.
+#
+# uStreamer drops identical frames (--drop-same-frames), so "no new frame
+# for stable_for seconds" counts as stable too.
+
+DIFF_SIZE = (160, 90)     # decoded frame size used for comparisons
+BLOCK = 10                # block edge in DIFF_SIZE pixels -> 16x9 grid
+DEFAULT_THRESHOLD = 4.0   # mean abs grey-level change that marks a block dirty
+MAX_MARKS = 32
+
+
+def _require():
+    if np is None:
+        raise RuntimeError("numpy and Pillow are required for screen detection")
+
+
+def small_frame(jpeg):
+    """Decode a JPEG to a DIFF_SIZE grayscale int16 array"""
+    img = Image.open(io.BytesIO(jpeg))
+    img.draft("L", DIFF_SIZE)
+    img = img.convert("L").resize(DIFF_SIZE)
+    return np.asarray(img, dtype=np.int16)
+
+
+def block_diff(a, b):
+    """Mean absolute difference per BLOCK x BLOCK tile"""
+    rows, cols = a.shape[0] // BLOCK, a.shape[1] // BLOCK
+    diff = np.abs(a - b)[:rows * BLOCK, :cols * BLOCK]
+    return diff.reshape(rows, BLOCK, cols, BLOCK).mean(axis=(1, 3))
+
+
+def changed_regions(mask):
+    """Bounding boxes of 4-connected dirty blocks, as fractions of the frame"""
+    rows, cols = mask.shape
+    seen = np.zeros_like(mask, dtype=bool)
+    regions = []
+    for r, c in zip(*np.nonzero(mask)):
+        if seen[r, c]:
+            continue
+        stack = [(r, c)]
+        seen[r, c] = True
+        top, left, bottom, right = r, c, r, c
+        while stack:
+            y, x = stack.pop()
+            top, left = min(top, y), min(left, x)
+            bottom, right = max(bottom, y), max(right, x)
+            for ny, nx in ((y - 1, x), (y + 1, x), (y, x - 1), (y, x + 1)):
+                if 0 <= ny < rows and 0 <= nx < cols and mask[ny, nx] and not seen[ny, nx]:
+                    seen[ny, nx] = True
+                    stack.append((ny, nx))
+        regions.append({
+            "x": round(int(left) / cols, 4),
+            "y": round(int(top) / rows, 4),
+            "w": round((int(right) - int(left) + 1) / cols, 4),
+            "h": round((int(bottom) - int(top) + 1) / rows, 4),
+        })
+    return regions
+
+
+class ScreenWatcher:
+    """Stability waits and change queries on top of one FrameGrabber"""
+
+    def __init__(self, grabber):
+        self.grabber = grabber
+        self._lock = threading.Lock()
+        self._marks = {}          # mark id (frame seq) -> small frame
+
+    def _decode(self, frame):
+        return small_frame(frame.jpeg)
+
+    def wait_until_stable(self, timeout, threshold=DEFAULT_THRESHOLD, stable_for=1.0):
+        """Wait until no block changes by more than `threshold` for `stable_for` s"""
+        _require()
+        start = time.monotonic()
+        deadline = start + timeout
+        frame = self.grabber.latest()
+        if frame is None:
+            return {"stable": False, "waited_ms": 0, "frames": 0, "detail": "no frame"}
+        prev = self._decode(frame)
+        seq = frame.seq
+        stable_since = start
+        frames = 1
+        while True:
+            now = time.monotonic()
+            if now - stable_since >= stable_for:
+                return {"stable": True, "waited_ms": int((now - start) * 1000), "frames": frames}
+            if now >= deadline:
+                return {"stable": False, "waited_ms": int((now - start) * 1000), "frames": frames}
+            wait = min(deadline, stable_since + stable_for) - now
+            frame = self.grabber.wait_next(seq, wait)
+            if frame is None or frame.seq == seq:
+                continue  # nothing new: identical frames are being dropped upstream
+            seq = frame.seq
+            frames += 1
+            cur = self._decode(frame)
+            if (block_diff(prev, cur) > threshold).any():
+                stable_since = time.monotonic()
+            prev = cur
+
+    def mark(self):
+        """Remember the current frame; returns an id for changes_since()"""
+        _require()
+        frame = self.grabber.latest()
+        if frame is None:
+            return None
+        small = self._decode(frame)
+        with self._lock:
+            self._marks[frame.seq] = small
+            while len(self._marks) > MAX_MARKS:
+                self._marks.pop(next(iter(self._marks)))
+        return frame.seq
+
+    def changes_since(self, mark_id, threshold=DEFAULT_THRESHOLD):
+        """Regions that differ between a mark and the current frame"""
+        _require()
+        with self._lock:
+            ref = self._marks.get(mark_id)
+        if ref is None:
+            raise KeyError(mark_id)
+        frame = self.grabber.latest()
+        if frame is None:
+            return None
+        mask = block_diff(ref, self._decode(frame)) > threshold
+        return {
+            "changed": bool(mask.any()),
+            "fraction": round(float(mask.mean()), 4),
+            "regions": changed_regions(mask),
+            "frame": frame.seq,
+        }
@@ -0,0 +1,152 @@
+import hashlib
+import io
+import threading
+import time
+import urllib.request
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are optional
+    Image = None
+
+# -----------------------------
+# Shared latest-frame cache
+# -----------------------------
+# One reader per uStreamer instance pulls the MJPEG stream and keeps only the
+# most recent JPEG in memory. Any number of /snapshot pollers are served from
+# that frame; its ETag is a content hash computed once per frame on demand,
+# and downscaled thumbnails are cached per size until the next frame. The
+# reader disconnects after IDLE_TIMEOUT without requests.
+
+STREAM_PATH = "/stream"
+# uStreamer lists this key in /state clients_stat, so the app's own readers
+# are not mistaken for viewers (see stream_quality.client_ratios)
+CLIENT_KEY = "streaming-hid-internal"
+IDLE_TIMEOUT = 30
+RECONNECT_DELAY = 2
+FIRST_FRAME_WAIT = 3
+
+
+class Frame:
+    __slots__ = ("jpeg", "seq", "received", "_etag")
+
+    def __init__(self, jpeg, seq):
+        self.jpeg = jpeg
+        self.seq = seq
+        self.received = time.monotonic()
+        self._etag = None
+
+    @property
+    def etag(self):
+        if self._etag is None:
+            self._etag = hashlib.blake2b(self.jpeg, digest_size=12).hexdigest()
+        return self._etag
+
+
+def read_mjpeg(resp):
+    """Yield JPEG payloads from a multipart/x-mixed-replace response"""
+    while True:
+        line = resp.readline()
+        if not line:
+            return
+        if not line.startswith(b"--"):
+            continue
+        length = None
+        while True:
+            header = resp.readline()
+            if not header:
+                return
+            header = header.strip()
+            if not header:
+                break
+            name, _, value = header.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+        if length is None:
+            continue
+        data = resp.read(length)
+        if len(data) < length:
+            return
+        yield data
+
+
+class FrameGrabber:
+    """Latest frame from one uStreamer, fetched over a single connection"""
+
+    def __init__(self, base_url):
+        self.url = f"{base_url}{STREAM_PATH}?key={CLIENT_KEY}"
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._last_used = time.monotonic()
+        self._thread = None
+        self._thumbs = {}                 # (seq, width) -> (etag, jpeg)
+        self.error = None
+
+    def touch(self):
+        """Mark the grabber as in use and make sure the reader is running"""
+        with self._cond:
+            self._last_used = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+                self._thread.start()
+
+    def latest(self, wait=FIRST_FRAME_WAIT):
+        """Most recent frame, waiting briefly for the first one"""
+        self.touch()
+        with self._cond:
+            self._cond.wait_for(lambda: self._frame is not None, wait)
+            return self._frame
+
+    def wait_next(self, after_seq, timeout):
+        """Block until a frame newer than `after_seq` arrives"""
+        self.touch()
+        with self._cond:
+            self._cond.wait_for(lambda: self._frame is not None and self._frame.seq > after_seq, timeout)
+            return self._frame
+
+    def thumbnail(self, frame, width):
+        """JPEG of `frame` scaled to `width` px, cached until the next frame"""
+        if Image is None:
+            raise RuntimeError("Pillow is not installed")
+        key = (frame.seq, width)
+        with self._cond:
+            cached = self._thumbs.get(key)
+        if cached:
+            return cached
+        img = Image.open(io.BytesIO(frame.jpeg))
+        img.draft("RGB", (width, 1))   # let libjpeg decode at a reduced scale
+        height = max(1, round(img.height * width / img.width))
+        img = img.convert("RGB").resize((width, height))
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=80)
+        cached = (f"{frame.etag}-w{width}", out.getvalue())
+        with self._cond:
+            self._thumbs = {k: v for k, v in self._thumbs.items() if k[0] == frame.seq}
+            self._thumbs[key] = cached
+        return cached
+
+    def _retire(self):
+        """True (and forget the reader) once nobody has asked for frames lately"""
+        with self._cond:
+            if time.monotonic() - self._last_used > IDLE_TIMEOUT:
+                self._thread = None
+                self._frame = None     # never serve a frame from before the gap
+                return True
+            return False
+
+    def _run(self):
+        while not self._retire():
+            try:
+                with urllib.request.urlopen(self.url, timeout=10) as resp:
+                    self.error = None
+                    for jpeg in read_mjpeg(resp):
+                        with self._cond:
+                            self._seq += 1
+                            self._frame = Frame(jpeg, self._seq)
+                            self._cond.notify_all()
+                        if self._retire():
+                            return
+            except (OSError, ValueError) as e:
+                self.error = str(e)
+            time.sleep(RECONNECT_DELAY)
@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+import urllib.request
+
+from snapshot import CLIENT_KEY
+
+# -----------------------------
+# Adaptive stream quality
+# -----------------------------
+# Polls each supervised uStreamer's /state, looks at how many viewers there
+# are and how many frames per second each of them actually receives compared
+# with what the encoder produces. uStreamer drops frames for clients that
+# cannot keep up, so a client fps well below the stream fps means that
+# viewer's link is saturated. The controller steps the instance down a
+# quality profile when that persists and back up once everyone keeps up
+# again, restarting just that uStreamer with the new arguments.
+
+PROFILES = [
+    {"name": "high", "resolution": "1920x1080", "quality": 80, "desired_fps": 0, "drop_same_frames": 45},
+    {"name": "medium", "resolution": "1280x720", "quality": 70, "desired_fps": 20, "drop_same_frames": 30},
+    {"name": "low", "resolution": "1280x720", "quality": 50, "desired_fps": 10, "drop_same_frames": 20},
+]
+PROFILE_NAMES = [p["name"] for p in PROFILES]
+
+POLL_INTERVAL = 5
+SLOW_RATIO = 0.5          # client fps / stream fps below this counts as starved
+FAST_RATIO = 0.9          # every client at or above this counts as keeping up
+DOWN_AFTER = 3            # consecutive starved polls before stepping down
+UP_AFTER = 12             # consecutive healthy polls before stepping up
+SETTLE_TIME = 20          # seconds after a switch before judging again
+MANY_VIEWERS = 4          # at this many viewers, never run the top profile
+
+
+def profile_args(name):
+    """uStreamer arguments for a quality profile"""
+    profile = PROFILES[PROFILE_NAMES.index(name)]
+    args = [
+        f"--resolution={profile['resolution']}",
+        f"--quality={profile['quality']}",
+        f"--drop-same-frames={profile['drop_same_frames']}",
+    ]
+    if profile["desired_fps"]:
+        args.append(f"--desired-fps={profile['desired_fps']}")
+    return args
+
+
+def read_state(port, timeout=2):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/state", timeout=timeout) as resp:
+        return json.load(resp).get("result", {})
+
+
+def client_ratios(state):
+    """(viewer count, [client fps / stream fps]) from a uStreamer /state result.
+
+    The app's own frame grabber (snapshots, screen watch, recorder) is not a
+    viewer and is left out.
+    """
+    stream = state.get("stream", {})
+    source = state.get("source", {})
+    stream_fps = stream.get("queued_fps") or source.get("captured_fps") or 0
+    clients = stream.get("clients_stat", {}) or {}
+    clients = {cid: c for cid, c in clients.items() if c.get("key") != CLIENT_KEY}
+    if not stream_fps:
+        return len(clients), []
+    return len(clients), [min(1.0, c.get("fps", 0) / stream_fps) for c in clients.values()]
+
+
+class QualityState:
+    def __init__(self):
+        self.level = 0            # index into PROFILES
+        self.auto = True
+        self.reason = "default profile"
+        self.changed_at = time.monotonic()
+        self.slow_polls = 0
+        self.fast_polls = 0
+        self.viewers = 0
+        self.ratios = []
+
+    def status(self):
+        return {
+            "profile": PROFILE_NAMES[self.level],
+            "auto": self.auto,
+            "reason": self.reason,
+            "since": round(time.monotonic() - self.changed_at, 1),
+            "viewers": self.viewers,
+            "client_fps_ratio": [round(r, 2) for r in self.ratios],
+        }
+
+
+class QualityController:
+    """Pick a quality profile per uStreamer instance from live client stats"""
+
+    def __init__(self, supervisor, poll_interval=POLL_INTERVAL):
+        self.supervisor = supervisor
+        self.poll_interval = poll_interval
+        self._states = {}         # usb_path -> QualityState
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stream-quality", daemon=True)
+            self._thread.start()
+
+    def status(self):
+        with self._lock:
+            return {path: st.status() for path, st in self._states.items()}
+
+    def set_profile(self, usb_path, name, auto=False):
+        """Pin a profile (auto=False) or pick a starting point for auto mode"""
+        if name not in PROFILE_NAMES:
+            raise ValueError(f"unknown profile '{name}'")
+        with self._lock:
+            st = self._states.setdefault(usb_path, QualityState())
+            st.auto = auto
+        self._switch(usb_path, st, PROFILE_NAMES.index(name), "set by request")
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            for inst in self.supervisor.instances():
+                if inst.state != "running":
+                    continue
+                try:
+                    state = read_state(inst.port)
+                except (OSError, ValueError):
+                    continue
+                self._evaluate(inst.usb_path, *client_ratios(state))
+
+    def _evaluate(self, usb_path, viewers, ratios):
+        with self._lock:
+            st = self._states.setdefault(usb_path, QualityState())
+            st.viewers, st.ratios = viewers, ratios
+            if not st.auto or time.monotonic() - st.changed_at < SETTLE_TIME:
+                return
+            starved = [r for r in ratios if r < SLOW_RATIO]
+            st.slow_polls = st.slow_polls + 1 if starved else 0
+            st.fast_polls = st.fast_polls + 1 if ratios and min(ratios) >= FAST_RATIO else 0
+            target, reason = st.level, None
+            if viewers >= MANY_VIEWERS and st.level == 0:
+                target, reason = 1, f"{viewers} viewers share the encoder"
+            elif st.slow_polls >= DOWN_AFTER and st.level < len(PROFILES) - 1:
+                target = st.level + 1
+                reason = f"{len(starved)}/{viewers} viewer(s) below {int(SLOW_RATIO * 100)}% of stream fps"
+            elif st.fast_polls >= UP_AFTER and st.level > 0 and not (viewers >= MANY_VIEWERS and st.level == 1):
+                target, reason = st.level - 1, f"all {viewers} viewer(s) keeping up"
+            if target == st.level:
+                return
+        self._switch(usb_path, st, target, reason)
+
+    def _switch(self, usb_path, st, level, reason):
+        with self._lock:
+            changed = level != st.level
+            st.level = level
+            st.reason = reason
+            st.changed_at = time.monotonic()
+            st.slow_polls = st.fast_polls = 0
+        if changed:
+            print(f"[*] Stream {usb_path} -> {PROFILE_NAMES[level]} ({reason})")
+            try:
+                self.supervisor.set_options(usb_path, profile=PROFILE_NAMES[level])
+            except KeyError:
+                pass  # capture device went away meanwhile
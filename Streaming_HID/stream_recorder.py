@@ -0,0 +1,229 @@
+import os
+import re
+import struct
+import threading
+import time
+
+# -----------------------------
+# Rolling MJPEG recorder
+# -----------------------------
+# Keeps the last few minutes of the stream on disk for post-mortem of boots
+# nobody was watching. JPEG frames from the FrameGrabber are appended as-is
+# (no re-encode) to segment files, with a fixed-size binary index record per
+# frame:
+#
+#   seg_<start_ms>.mjpeg   concatenated JPEGs
+#   seg_<start_ms>.idx     <d Q I> wall-clock time, offset, length per frame
+#
+# All writes are sequential appends through large buffers. Whole segments
+# are deleted oldest-first to stay inside the time window and byte budget.
+# A disk error (card full or remounted read-only, directory removed) skips
+# frames and retries with a doubling backoff instead of ending the thread.
+
+RECORD_DIR = "/home/rpi/stream_recordings"
+KEEP_SECONDS = 600
+SEGMENT_SECONDS = 60
+MAX_BYTES = 1 << 30
+MAX_FPS = 5                     # recording rate cap; the live stream is unaffected
+FLUSH_INTERVAL = 2
+WRITE_BUFFER = 1 << 20
+RETRY_MIN = 1                   # seconds before reopening after a disk error, doubling
+RETRY_MAX = 60
+
+INDEX_RECORD = struct.Struct("<dQI")
+_SEGMENT_RE = re.compile(r"^seg_(\d+)\.mjpeg$")
+
+
+class StreamRecorder:
+    """Ring buffer of recent frames from one FrameGrabber"""
+
+    def __init__(self, grabber, directory, keep_seconds=KEEP_SECONDS, segment_seconds=SEGMENT_SECONDS,
+                 max_bytes=MAX_BYTES, max_fps=MAX_FPS):
+        self.grabber = grabber
+        self.directory = directory
+        self.keep_seconds = keep_seconds
+        self.segment_seconds = segment_seconds
+        self.max_bytes = max_bytes
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._data = None
+        self._index = None
+        self._segment = None          # start_ms of the open segment
+        self._segment_started = 0.0
+        self._offset = 0
+        self._last_flush = 0.0
+        self._retry_at = 0.0          # no segment is opened before this (after an error)
+        self._retry_delay = RETRY_MIN
+        self.frames_written = 0
+        self.last_error = None
+
+    # ---- control ----
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._retry_at = 0.0
+        self._retry_delay = RETRY_MIN
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stream-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            self._close_segment()
+
+    def recording(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self):
+        segments = self._segments()
+        sizes = [os.path.getsize(self._data_path(s)) for s in segments if os.path.exists(self._data_path(s))]
+        return {
+            "recording": self.recording(),
+            "segments": len(segments),
+            "bytes": sum(sizes),
+            "oldest": segments[0] / 1000 if segments else None,
+            "frames_written": self.frames_written,
+            "last_error": self.last_error,
+        }
+
+    # ---- export ----
+
+    def export(self, start, end):
+        """Yield the JPEGs recorded between wall-clock times start and end"""
+        with self._lock:
+            if self._data is not None:
+                self._data.flush()
+                self._index.flush()
+        segments = self._segments()
+        for i, seg in enumerate(segments):
+            seg_end = segments[i + 1] / 1000 if i + 1 < len(segments) else time.time()
+            if seg_end < start or seg / 1000 > end:
+                continue
+            try:
+                with open(self._index_path(seg), "rb") as f:
+                    raw = f.read()
+                with open(self._data_path(seg), "rb") as data:
+                    usable = len(raw) - len(raw) % INDEX_RECORD.size
+                    for ts, offset, length in INDEX_RECORD.iter_unpack(raw[:usable]):
+                        if start <= ts <= end:
+                            data.seek(offset)
+                            yield data.read(length)
+            except FileNotFoundError:
+                continue  # rotated away while exporting
+
+    # ---- recording thread ----
+
+    def _run(self):
+        seq = 0
+        last_write = 0.0
+        while not self._stop.is_set():
+            frame = self.grabber.wait_next(seq, 1.0)
+            now = time.monotonic()
+            if frame is not None and frame.seq != seq:
+                seq = frame.seq
+                if now - last_write >= self.min_interval:
+                    last_write = now
+                    with self._lock:
+                        self._write(frame.jpeg)
+            if self._data is not None and now - self._last_flush >= FLUSH_INTERVAL:
+                with self._lock:
+                    self._flush(now)
+
+    def _write(self, jpeg):
+        now = time.monotonic()
+        if self._data is None or now - self._segment_started >= self.segment_seconds:
+            if now < self._retry_at or not self._rotate(now):
+                return                # disk trouble; frames are skipped until the retry
+        try:
+            self._data.write(jpeg)
+            self._index.write(INDEX_RECORD.pack(time.time(), self._offset, len(jpeg)))
+        except OSError as e:
+            self._failed(now, f"write error: {e}")
+            return
+        self._offset += len(jpeg)
+        self.frames_written += 1
+
+    def _flush(self, now):
+        self._last_flush = now
+        if self._data is not None:
+            try:
+                self._data.flush()
+                self._index.flush()
+            except OSError as e:
+                print("[!] Recorder flush error:", e)
+
+    def _rotate(self, now):
+        """Start a new segment; False (and a retry later) if the disk won't have it"""
+        self._close_segment()
+        self._segment = int(time.time() * 1000)
+        self._segment_started = now
+        self._offset = 0
+        try:
+            # The directory may have been removed, or the card remounted read-only
+            os.makedirs(self.directory, exist_ok=True)
+            self._data = open(self._data_path(self._segment), "ab", buffering=WRITE_BUFFER)
+            self._index = open(self._index_path(self._segment), "ab", buffering=64 * 1024)
+            self._enforce_limits()
+        except OSError as e:
+            self._failed(now, f"cannot open segment: {e}")
+            return False
+        if self.last_error is not None:
+            print(f"[*] Recorder writing to {self.directory} again")
+            self.last_error = None
+        self._retry_delay = RETRY_MIN
+        return True
+
+    def _failed(self, now, error):
+        print(f"[!] Recorder {error}; retrying in {self._retry_delay}s")
+        self.last_error = error
+        self._close_segment()
+        self._retry_at = now + self._retry_delay
+        self._retry_delay = min(self._retry_delay * 2, RETRY_MAX)
+
+    def _close_segment(self):
+        for f in (self._data, self._index):
+            if f is not None:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+        self._data = self._index = None
+        self._segment = None
+
+    def _enforce_limits(self):
+        """Drop whole segments, oldest first, outside the window or budget"""
+        segments = [s for s in self._segments() if s != self._segment]
+        cutoff = (time.time() - self.keep_seconds) * 1000
+        total = sum(os.path.getsize(self._data_path(s)) for s in segments
+                    if os.path.exists(self._data_path(s)))
+        for i, seg in enumerate(segments):
+            seg_end = segments[i + 1] if i + 1 < len(segments) else self._segment or seg
+            if seg_end >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                total -= os.path.getsize(self._data_path(seg))
+                os.remove(self._data_path(seg))
+                os.remove(self._index_path(seg))
+            except OSError:
+                pass
+
+    # ---- paths ----
+
+    def _segments(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(int(m.group(1)) for m in map(_SEGMENT_RE.match, names) if m)
+
+    def _data_path(self, seg):
+        return os.path.join(self.directory, f"seg_{seg}.mjpeg")
+
+    def _index_path(self, seg):
+        return os.path.join(self.directory, f"seg_{seg}.idx")
@@ -0,0 +1,254 @@
+import json
+import signal
+import subprocess
+import threading
+import time
+import urllib.request
+
+from capture_devices import primary_path
+
+# -----------------------------
+# uStreamer supervisor
+# -----------------------------
+# Runs one uStreamer per capture device, each on its own HTTP port, probes
+# every instance's /state endpoint and restarts dead or wedged instances with
+# exponential backoff. The main capture keeps the historical port 9000 so
+# existing pages continue to work: the first hub port, or the lowest video
+# device when nothing is plugged in there (a single dongle connected
+# directly). :9000 stays with its device until that is unplugged, then
+# passes to the next primary.
+
+BASE_PORT = 9000
+PROBE_INTERVAL = 5        # seconds between /state probes per instance
+PROBE_TIMEOUT = 2
+PROBE_FAILURES = 3        # consecutive failed probes before a restart
+START_GRACE = 5           # seconds after start before probes count
+MIN_BACKOFF = 1
+MAX_BACKOFF = 60
+STABLE_AFTER = 60         # healthy uptime that resets the backoff
+
+
+class StreamInstance:
+    def __init__(self, usb_path, device, port):
+        self.usb_path = usb_path
+        self.device = device
+        self.port = port
+        self.proc = None
+        self.started_at = None
+        self.restarts = 0
+        self.backoff = MIN_BACKOFF
+        self.next_start = 0.0
+        self.next_probe = 0.0
+        self.probe_failures = 0
+        self.last_error = None
+        self.state = "stopped"
+        self.options = {}                 # extra keyword arguments for the command builder
+
+    def running(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def status(self):
+        uptime = time.monotonic() - self.started_at if self.running() and self.started_at else 0
+        return {
+            "usb_path": self.usb_path,
+            "device": self.device,
+            "port": self.port,
+            "pid": self.proc.pid if self.running() else None,
+            "state": self.state,
+            "uptime": round(uptime, 1),
+            "restarts": self.restarts,
+            "last_error": self.last_error,
+        }
+
+
+class UstreamerSupervisor:
+    """Keep one healthy uStreamer per capture device"""
+
+    def __init__(self, cmd_builder, first_port_path=None, base_port=BASE_PORT):
+        self.cmd_builder = cmd_builder        # (device, port, **options) -> argv
+        self.first_port_path = first_port_path
+        self.base_port = base_port
+        self._instances = {}                  # usb_path -> StreamInstance
+        self._ports = {}                      # usb_path -> port, stable for the process
+        self._options = {}                    # usb_path -> options, kept across re-plugs
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._enabled = False
+        self._thread = None
+
+    # ---- control ----
+
+    def start(self, mapping):
+        with self._lock:
+            self._enabled = True
+            self.sync(mapping)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ustreamer-supervisor", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self):
+        with self._lock:
+            self._enabled = False
+            for inst in self._instances.values():
+                self._terminate(inst)
+                inst.state = "stopped"
+
+    def running(self):
+        with self._lock:
+            return self._enabled
+
+    def sync(self, mapping):
+        """Match instances to the current {usb_path: device} map"""
+        with self._lock:
+            for usb_path in list(self._instances):
+                inst = self._instances[usb_path]
+                if mapping.get(usb_path) != inst.device:
+                    print(f"[*] Capture {usb_path} gone, stopping uStreamer on :{inst.port}")
+                    self._terminate(inst)
+                    del self._instances[usb_path]
+            primary = primary_path(mapping, self.first_port_path)
+            base_free = all(inst.port != self.base_port for inst in self._instances.values())
+            inst = self._instances.get(primary)
+            if base_free and inst is not None:
+                # Whatever held :9000 is gone; move the primary capture onto it
+                print(f"[*] Moving {primary} from :{inst.port} to :{self.base_port}")
+                self._terminate(inst)
+                inst.port = self._port_for(primary, base=True)
+                inst.next_start = 0.0
+            # The primary first, so it can take :9000 before anything else is numbered
+            for usb_path in sorted(mapping, key=lambda p: p != primary):
+                if usb_path not in self._instances:
+                    port = self._port_for(usb_path, base=base_free and usb_path == primary)
+                    inst = StreamInstance(usb_path, mapping[usb_path], port)
+                    # A re-plugged capture comes back with the profile it had
+                    inst.options.update(self._options.get(usb_path, {}))
+                    self._instances[usb_path] = inst
+        self._wake.set()
+
+    def restart(self, usb_path=None):
+        """Restart one instance (or all) now"""
+        with self._lock:
+            targets = [self._instances[usb_path]] if usb_path else list(self._instances.values())
+            for inst in targets:
+                self._terminate(inst)
+                inst.next_start = 0.0
+        self._wake.set()
+
+    def set_options(self, usb_path, **options):
+        """Change an instance's command-line options and restart it with them"""
+        with self._lock:
+            self._instances[usb_path].options.update(options)
+            self._options.setdefault(usb_path, {}).update(options)
+        self.restart(usb_path)
+
+    def instances(self):
+        with self._lock:
+            return list(self._instances.values())
+
+    def status(self):
+        with self._lock:
+            return [inst.status() for inst in sorted(self._instances.values(), key=lambda i: i.port)]
+
+    # ---- internals ----
+
+    def _port_for(self, usb_path, base=False):
+        """Port for a new instance; stable per device unless :9000 changes hands"""
+        if base:
+            for other, port in list(self._ports.items()):
+                if port == self.base_port and other != usb_path:
+                    del self._ports[other]   # renumbered when it comes back
+            self._ports[usb_path] = self.base_port
+            return self.base_port
+        port = self._ports.get(usb_path)
+        live = {inst.port for inst in self._instances.values()}
+        if port is None or port in live:
+            used = set(self._ports.values()) | live | {self.base_port}
+            # The base port is only ever given to the primary capture
+            port = self.base_port + 1
+            while port in used:
+                port += 1
+            self._ports[usb_path] = port
+        return port
+
+    def _run(self):
+        while True:
+            self._wake.wait(1)
+            self._wake.clear()
+            with self._lock:
+                if not self._enabled:
+                    continue
+                now = time.monotonic()
+                due = [inst for inst in list(self._instances.values()) if self._check(inst, now)]
+            # Probe without the lock so status requests are never held up
+            results = [(inst, self._probe(inst)) for inst in due]
+            with self._lock:
+                now = time.monotonic()
+                for inst, ok in results:
+                    if self._enabled and self._instances.get(inst.usb_path) is inst and inst.running():
+                        self._probed(inst, ok, now)
+
+    def _check(self, inst, now):
+        """Respawn a dead instance; return True if a live one is due a probe"""
+        if not inst.running():
+            if inst.proc is not None:
+                code = inst.proc.returncode
+                inst.proc = None
+                self._failed(inst, f"exited with code {code}", now)
+            if now >= inst.next_start:
+                self._spawn(inst, now)
+            return False
+        if now < inst.next_probe:
+            return False
+        inst.next_probe = now + PROBE_INTERVAL
+        return True
+
+    def _probed(self, inst, ok, now):
+        if ok:
+            inst.probe_failures = 0
+            inst.state = "running"
+            if now - inst.started_at > STABLE_AFTER:
+                inst.backoff = MIN_BACKOFF
+            return
+        inst.probe_failures += 1
+        if inst.probe_failures >= PROBE_FAILURES:
+            self._terminate(inst)
+            self._failed(inst, f"{inst.probe_failures} failed health probes", now)
+
+    def _spawn(self, inst, now):
+        cmd = self.cmd_builder(inst.device, inst.port, **inst.options)
+        try:
+            inst.proc = subprocess.Popen(cmd)
+        except OSError as e:
+            self._failed(inst, str(e), now)
+            return
+        print(f"[*] uStreamer for {inst.device} on :{inst.port} (pid {inst.proc.pid})")
+        inst.started_at = now
+        inst.next_probe = now + START_GRACE
+        inst.probe_failures = 0
+        inst.state = "starting"
+
+    def _failed(self, inst, reason, now):
+        print(f"[!] uStreamer on :{inst.port} failed ({reason}), retry in {inst.backoff}s")
+        inst.last_error = reason
+        inst.state = "backoff"
+        inst.restarts += 1
+        inst.next_start = now + inst.backoff
+        inst.backoff = min(inst.backoff * 2, MAX_BACKOFF)
+
+    def _probe(self, inst):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{inst.port}/state", timeout=PROBE_TIMEOUT) as resp:
+                return bool(json.load(resp).get("ok"))
+        except (OSError, ValueError):
+            return False
+
+    def _terminate(self, inst):
+        if inst.running():
+            inst.proc.send_signal(signal.SIGINT)
+            try:
+                inst.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                inst.proc.kill()
+                inst.proc.wait()
+        inst.proc = None